@@ -0,0 +1,266 @@
+"""Load simulation of the BetterTrends manager.
+
+Drives ``BetterTrendsManager._process_trends`` and ``_calculate_trend`` against a
+local stand-in for ``hass.states`` and reports, for every combination of entity
+count, window size, update rate and share of unusable states:
+
+* per-tick latency (p50, p95, max)
+* throughput in samples per second
+* trend calculation time per entity with a full window (``_calculate_trend``, or
+  ``BatchTrendEngine.compute`` with the NumPy engine)
+* allocations: net memory blocks retained per tick and generation 0 collections
+* peak traced memory during the ticks
+
+Needs Home Assistant installed (as in the development environment of the
+integration), but no running instance:
+
+    python benchmarks/bench_manager.py --entities 10,100,1000,10000 --steps 10,60
+    python benchmarks/bench_manager.py --invalid 0,0.2 --update-rate 0.1,1 --json results.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from homeassistant.core import State  # noqa: E402
+
+from custom_components.better_trends.const import (  # noqa: E402
+    CONF_ENGINE, CONF_WINDOW_MODE, ENGINE_NUMPY, ENGINE_PYTHON, WINDOW_MODE_ROLLING, WINDOW_MODE_TUMBLING,
+)
+from custom_components.better_trends.sensor import BetterTrendsManager  # noqa: E402
+
+INVALID_STATES = ("unknown", "unavailable", "open")
+
+
+class BenchmarkStates:
+    """Stand-in for ``hass.states`` keeping plain ``State`` objects in a dict."""
+
+    def __init__(self):
+        self._states = {}
+
+    def get(self, entity_id):
+        return self._states.get(entity_id)
+
+    def async_set(self, entity_id, new_state, attributes=None, force_update=False):
+        self._states[entity_id] = State(entity_id, str(new_state), attributes)
+
+
+def create_hass(config_dir):
+    """Return the parts of a Home Assistant instance the manager uses while processing trends."""
+    return SimpleNamespace(
+        states=BenchmarkStates(),
+        data={},
+        config=SimpleNamespace(config_dir=config_dir, path=lambda *parts: os.path.join(config_dir, *parts)),
+    )
+
+
+class Scenario:
+    """Source entities whose states change at a given rate, some of them unusable."""
+
+    def __init__(self, hass, entities: int, update_rate: float, invalid: float, seed: int):
+        self._states = hass.states
+        self._random = random.Random(seed)
+        self._update_rate = update_rate
+        self.entity_ids = [f"sensor.load_{index}" for index in range(entities)]
+        invalid_count = int(entities * invalid)
+        self._invalid = set(self.entity_ids[:invalid_count])
+        self.numeric_ids = self.entity_ids[invalid_count:]
+        self._values = {}
+        for entity_id in self.entity_ids:
+            self._values[entity_id] = self._random.uniform(-20.0, 40.0)
+            self._write(entity_id)
+
+    def _write(self, entity_id):
+        if entity_id in self._invalid:
+            self._states.async_set(entity_id, self._random.choice(INVALID_STATES))
+        else:
+            self._states.async_set(entity_id, round(self._values[entity_id], 2))
+
+    def advance(self):
+        """Give a share of the numeric entities a new state, like between two ticks."""
+        for entity_id in self.entity_ids:
+            if entity_id not in self._invalid and self._random.random() < self._update_rate:
+                self._values[entity_id] += self._random.gauss(0.0, 0.5)
+                self._write(entity_id)
+
+
+async def create_manager(hass, entity_ids, steps: int, options: dict) -> BetterTrendsManager:
+    """Create a manager with buffers sized for ``steps``, as after it was added to Home Assistant."""
+    manager = BetterTrendsManager(hass, entity_ids, options)
+    manager._trend_values = steps
+    await manager._initialize_buffers()
+    return manager
+
+
+async def run_ticks(manager, scenario, ticks: int, trace: bool):
+    """Process ``ticks`` ticks and return the measurements.
+
+    Only the manager is measured, the state changes of the scenario between ticks are not.
+    """
+    durations = []
+    processed_before = manager._stats.processed + manager._stats.skipped
+    blocks = 0
+    collections = 0
+    if trace:
+        tracemalloc.start()
+
+    for _ in range(ticks):
+        blocks_before = sys.getallocatedblocks()
+        collections_before = gc.get_stats()[0]["collections"]
+        started = time.perf_counter()
+        await manager._process_trends()
+        durations.append(time.perf_counter() - started)
+        blocks += sys.getallocatedblocks() - blocks_before
+        collections += gc.get_stats()[0]["collections"] - collections_before
+        scenario.advance()
+
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "durations": durations,
+        "samples": manager._stats.processed + manager._stats.skipped - processed_before,
+        "blocks_per_tick": blocks / ticks,
+        "gen0_collections": collections,
+        "peak_bytes": peak,
+    }
+
+
+def time_calculate_trend(manager, scenario, steps: int, repeat: int = 3) -> float:
+    """Return the best time to calculate the trend of one entity with a full window, in seconds.
+
+    The windows of the numeric entities are filled first: after the ticks, tumbling
+    windows were just cleared and the NumPy engine keeps no per-entity buffers.
+    """
+    entity_ids = scenario.numeric_ids
+    if not entity_ids:
+        return 0.0
+    window = [random.Random(index).uniform(-20.0, 40.0) for index in range(steps + 1)]
+    batch = manager._batch
+    if batch is not None:
+        for entity_id in entity_ids:
+            batch.load(entity_id, window)
+    else:
+        records = [manager._records[entity_id] for entity_id in entity_ids]
+        for record in records:
+            manager._reset_record(record)
+            for value in window:
+                manager._append_sample(record, value)
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if batch is not None:
+            batch.compute(batch.full_rows())
+        else:
+            for record in records:
+                manager._calculate_trend(record)
+        best = min(best, time.perf_counter() - started)
+    return best / len(entity_ids)
+
+
+async def run_case(config_dir, entities, steps, update_rate, invalid, args) -> dict:
+    """Measure one combination of the benchmark parameters."""
+    options = {CONF_ENGINE: args.engine, CONF_WINDOW_MODE: args.window_mode}
+    ticks = args.ticks or 2 * (steps + 1)
+    result = {
+        "entities": entities, "steps": steps, "update_rate": update_rate, "invalid": invalid, "ticks": ticks,
+        "engine": args.engine, "window_mode": args.window_mode,
+    }
+
+    # Timing and allocation pass, without tracemalloc slowing every allocation down
+    hass = create_hass(config_dir)
+    scenario = Scenario(hass, entities, update_rate, invalid, args.seed)
+    manager = await create_manager(hass, scenario.entity_ids, steps, options)
+    gc.collect()
+    measured = await run_ticks(manager, scenario, ticks, trace=False)
+    durations = sorted(measured["durations"])
+    total = sum(durations)
+    result.update({
+        "p50_ms": statistics.median(durations) * 1000,
+        "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+        "max_ms": durations[-1] * 1000,
+        "samples_per_s": measured["samples"] / total if total else 0.0,
+        "calculate_us": time_calculate_trend(manager, scenario, steps) * 1e6,
+        "blocks_per_tick": measured["blocks_per_tick"],
+        "gen0_collections": measured["gen0_collections"],
+    })
+
+    # Memory pass on a fresh manager
+    hass = create_hass(config_dir)
+    scenario = Scenario(hass, entities, update_rate, invalid, args.seed)
+    manager = await create_manager(hass, scenario.entity_ids, steps, options)
+    gc.collect()
+    result["peak_kib"] = (await run_ticks(manager, scenario, ticks, trace=True))["peak_bytes"] / 1024
+    return result
+
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(",") if item]
+
+
+async def main_async(args):
+    columns = (
+        ("entities", "entities", 8, "d"), ("steps", "steps", 6, "d"), ("update_rate", "update", 7, ".2f"),
+        ("invalid", "invalid", 8, ".2f"), ("p50_ms", "p50 ms", 9, ".3f"), ("p95_ms", "p95 ms", 9, ".3f"),
+        ("max_ms", "max ms", 9, ".3f"), ("samples_per_s", "samples/s", 12, ".0f"),
+        ("calculate_us", "calc us", 9, ".3f"), ("blocks_per_tick", "blocks/t", 10, ".1f"),
+        ("gen0_collections", "gen0", 6, "d"), ("peak_kib", "peak KiB", 10, ".1f"),
+    )
+    print(f"engine={args.engine} window_mode={args.window_mode}")
+    print("".join(f"{header:>{width}}" for _, header, width, _ in columns))
+
+    results = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        for entities in args.entities:
+            for steps in args.steps:
+                for update_rate in args.update_rate:
+                    for invalid in args.invalid:
+                        result = await run_case(config_dir, entities, steps, update_rate, invalid, args)
+                        results.append(result)
+                        print("".join(f"{result[key]:>{width}{spec}}" for key, _, width, spec in columns))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=lambda value: parse_list(value, int), default=[10, 100, 1000, 10000],
+                        help="Comma separated numbers of tracked entities")
+    parser.add_argument("--steps", type=lambda value: parse_list(value, int), default=[10],
+                        help="Comma separated window sizes (steps)")
+    parser.add_argument("--update-rate", type=lambda value: parse_list(value, float), default=[1.0],
+                        help="Comma separated shares of entities changing between two ticks")
+    parser.add_argument("--invalid", type=lambda value: parse_list(value, float), default=[0.0, 0.1],
+                        help="Comma separated shares of entities with unknown or non-numeric states")
+    parser.add_argument("--ticks", type=int, default=0, help="Ticks per case, default two windows")
+    parser.add_argument("--engine", choices=(ENGINE_PYTHON, ENGINE_NUMPY), default=ENGINE_PYTHON)
+    parser.add_argument("--window-mode", choices=(WINDOW_MODE_TUMBLING, WINDOW_MODE_ROLLING),
+                        default=WINDOW_MODE_TUMBLING)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the results to this JSON file, to compare runs")
+    parser.add_argument("--log", action="store_true", help="Keep the integration's logging enabled")
+    args = parser.parse_args(argv)
+
+    if not args.log:
+        # Skipped entities log a warning on every tick, which would dominate the timings
+        logging.disable(logging.CRITICAL)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Memory used per tracked entity by the BetterTrends manager state.
+
+Compares the previous layout (a dict of Python lists of boxed floats plus a dict of
+last trends, with the trend sensor id formatted on every tick) with the compact
+per-entity record (slotted ``TrackedEntity`` holding an ``array("d")`` ring buffer
+and a precomputed sensor id).
+
+Runs without Home Assistant:
+
+    python benchmarks/bench_memory.py --entities 5000 --steps 10
+"""
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "custom_components", "better_trends"))
+
+from buffer import TrendBuffer  # noqa: E402
+from record import TrackedEntity  # noqa: E402
+
+
+def entity_ids(count):
+    return [f"sensor.benchmark_temperature_{index}" for index in range(count)]
+
+
+def build_lists(ids, steps):
+    """Previous layout: one list of floats per entity and a dict of last trends.
+
+    Every trend sensor entity formatted its own copy of the sensor id.
+    """
+    buffers = {}
+    last_trends = {}
+    sensor_ids = []
+    for entity_id in ids:
+        buffers[entity_id] = [random.uniform(-20.0, 40.0) for _ in range(steps + 1)]
+        last_trends[entity_id] = random.uniform(-5.0, 5.0)
+        sensor_ids.append(f"sensor.bettertrends_{entity_id.replace('.', '_')}")
+    return buffers, last_trends, sensor_ids
+
+
+def build_records(ids, steps):
+    """Compact layout: one slotted record per entity with an array-backed buffer.
+
+    The trend sensor entity reuses the interned sensor id of the record.
+    """
+    records = {}
+    for entity_id in ids:
+        record = records[entity_id] = TrackedEntity(entity_id)
+        record.buffer = TrendBuffer(steps + 1)
+        for _ in range(steps + 1):
+            record.buffer.append(random.uniform(-20.0, 40.0))
+        record.last_trend = random.uniform(-5.0, 5.0)
+    return records
+
+
+def measure(build, ids, steps):
+    """Return (retained bytes, peak bytes) of the structures built by ``build``."""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build(ids, steps)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current - baseline, peak - baseline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=5000, help="Number of tracked entities")
+    parser.add_argument("--steps", type=int, default=10, help="Steps per trend window")
+    args = parser.parse_args(argv)
+
+    ids = entity_ids(args.entities)  # Entity id strings exist in both layouts, so they are not counted
+    print(f"{args.entities} entities, {args.steps} steps per window")
+    print(f"{'layout':<10}{'bytes/entity':>14}{'peak bytes/entity':>20}")
+    for name, build in (("lists", build_lists), ("records", build_records)):
+        current, peak = measure(build, ids, args.steps)
+        print(f"{name:<10}{current / args.entities:>14.1f}{peak / args.entities:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,44 @@
 from homeassistant.components.persistent_notification import async_create
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+import asyncio
 import logging
 from pathlib import Path
-from homeassistant.components.http import HomeAssistantView
-from aiohttp import web
+
+from .const import DATA_NUMBERS_READY, DATA_COORDINATOR, CONF_ENTITIES
+from .coordinator import BetterTrendsCoordinator, GroupIds
+from .resources import BetterTrendsResourceView, build_resource_index, resource_url
+from .services import async_register_services
+from .websocket_api import async_register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "better_trends"
+DATA_RESOURCES = f"{DOMAIN}_resources"
 
 # Define Lovelace resources
 LOVELACE_RESOURCES = [
-    {"url": "/hacsfiles/better_trends/lovelace/trend-card.min.js", "type": "module"},
-    {"url": "/hacsfiles/better_trends/lovelace/trend-card-lite.min.js", "type": "module"},
+    {"filename": "trend-card.min.js", "type": "module"},
+    {"filename": "trend-card-lite.min.js", "type": "module"},
 ]
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up BetterTrends from a config entry."""
-    component_path = Path(__file__).parent
-    hass.http.register_view(BetterTrendsResourceView(component_path))
-
-    # Check if the notification was already sent
-    notified = entry.data.get("notified", False)
+    if DATA_RESOURCES not in hass.data:
+        # Read and compress the cards once per Home Assistant run, off the event loop
+        component_path = Path(__file__).parent
+        index = await hass.async_add_executor_job(build_resource_index, component_path / "lovelace")
+        hass.http.register_view(BetterTrendsResourceView(index))
+        hass.data[DATA_RESOURCES] = index
+    index = hass.data[DATA_RESOURCES]
+    async_register_websocket_commands(hass)
+    async_register_services(hass)
+    if DATA_COORDINATOR not in hass.data:
+        hass.data[DATA_COORDINATOR] = BetterTrendsCoordinator()
+
+    # Check if the notification was already sent, for this or an earlier group
+    notified = any(other.data.get("notified", False) for other in hass.config_entries.async_entries(DOMAIN))
 
     if not notified:
         # Send the notification
@@ -32,8 +47,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             (
                 "BetterTrends was installed, but the Lovelace resources could not be added automatically.\n\n"
                 f"Please add them manually via Dashboard Resources:\n\n"
-                f"- URL: {LOVELACE_RESOURCES[0]['url']} (Type: {LOVELACE_RESOURCES[0]['type']})\n"
-                f"- URL: {LOVELACE_RESOURCES[1]['url']} (Type: {LOVELACE_RESOURCES[1]['type']})\n\n"
+                f"- URL: {resource_url(index, LOVELACE_RESOURCES[0]['filename'])} (Type: {LOVELACE_RESOURCES[0]['type']})\n"
+                f"- URL: {resource_url(index, LOVELACE_RESOURCES[1]['filename'])} (Type: {LOVELACE_RESOURCES[1]['type']})\n\n"
                 "Go to **Settings > Dashboards > Resources** to add them."
             ),
             title="BetterTrends Installation",
@@ -45,38 +60,42 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         hass.config_entries.async_update_entry(entry, data=new_data)
         _LOGGER.debug("BetterTrends notification sent and entry updated.")
 
+    # The number platform sets these once its entities wrote their state, the manager of the entry waits for them
+    ids = GroupIds(entry)
+    hass.data.setdefault(DATA_NUMBERS_READY, {})[entry.entry_id] = {
+        unique_id: asyncio.Event() for unique_id in (ids.interval, ids.steps, ids.counter)
+    }
+
     # Forward the setup to the appropriate platforms
     await hass.config_entries.async_forward_entry_setups(entry, ["sensor", "number"])
 
+    # Apply entity changes in place and reload the entry after option changes
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply entity changes to the running manager, reload the entry after option changes."""
+    manager = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if manager is not None and manager.options == dict(entry.options):
+        await manager.async_set_entities(entry.data.get(CONF_ENTITIES, []))
+        hass.data[DATA_COORDINATOR].rebalance()
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_forward_entry_unload(entry, "sensor")
     unload_ok &= await hass.config_entries.async_forward_entry_unload(entry, "number")
 
     if unload_ok:
-        # Clean up hass.data for the integration
-        if DOMAIN in hass.data:
-            hass.data.pop(DOMAIN, None)
+        # Only this entry's manager goes, the managers of the other entries keep running
+        hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+        hass.data.get(DATA_NUMBERS_READY, {}).pop(entry.entry_id, None)
+        if DATA_COORDINATOR in hass.data:
+            hass.data[DATA_COORDINATOR].unregister(entry.entry_id)
 
     return unload_ok
 
-
-class BetterTrendsResourceView(HomeAssistantView):
-    """Serve custom Lovelace resources for BetterTrends."""
-
-    url = "/hacsfiles/better_trends/lovelace/{filename}"
-    name = "hacsfiles:better_trends"
-    requires_auth = False
-
-    def __init__(self, component_path):
-        self._component_path = Path(component_path)
-
-    async def get(self, request, filename):
-        """Serve the requested file."""
-        file_path = self._component_path / "lovelace" / filename
-        if not file_path.exists():
-            return web.Response(status=404, text="Resource not found.")
-        return web.FileResponse(file_path)
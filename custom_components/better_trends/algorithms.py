@@ -0,0 +1,152 @@
+"""Incremental trend algorithms.
+
+Every algorithm is fed one sample at a time together with the sample that left the
+window (if any) and updates its state in O(1), so no algorithm rescans the buffer.
+"""
+from collections import deque
+
+from .const import ALGORITHM_EWMA, ALGORITHM_MIN_MAX, ALGORITHM_SLOPE
+
+
+def mean_delta(last: float, mean: float) -> float:
+    """Return the default trend: the last sample minus the average of the window."""
+    return round(last - mean, 2) + 0.0  # Adding 0.0 turns -0.0 into 0.0
+
+
+class TrendAlgorithm:
+    """Base class of the incremental trend algorithms."""
+
+    name = None
+
+    def __init__(self, window: int, interval: float):
+        self._window = max(1, int(window))
+        self._interval = interval  # Seconds between two samples
+        self.reset()
+
+    def reset(self):
+        """Forget all samples."""
+        raise NotImplementedError
+
+    def update(self, value: float, evicted=None):
+        """Add a sample. ``evicted`` is the sample that dropped out of the window, if any."""
+        raise NotImplementedError
+
+    def value(self):
+        """Return the current trend value, or None if there is not enough data."""
+        raise NotImplementedError
+
+    def attributes(self):
+        """Return extra state attributes for the trend sensor."""
+        return None
+
+
+class EwmaDeviation(TrendAlgorithm):
+    """Deviation of the last sample from its exponentially weighted moving average."""
+
+    name = ALGORITHM_EWMA
+
+    def reset(self):
+        self._alpha = 2 / (self._window + 1)  # Same center of mass as a simple mean over the window
+        self._average = None
+        self._last = None
+
+    def update(self, value: float, evicted=None):
+        if self._average is None:
+            self._average = value
+        else:
+            self._average += self._alpha * (value - self._average)
+        self._last = value
+
+    def value(self):
+        if self._last is None:
+            return None
+        return round(self._last - self._average, 2) + 0.0
+
+    def attributes(self):
+        return {"ewma": round(self._average, 2)} if self._average is not None else None
+
+
+class LinearSlope(TrendAlgorithm):
+    """Least-squares slope over the window, scaled to a rate per hour.
+
+    Samples are indexed 0..n-1 from the oldest one. Only the sum of the samples and the
+    sum of index * sample are kept: evicting the oldest sample shifts every index by one,
+    which lowers the weighted sum by the sum of the remaining samples.
+    """
+
+    name = ALGORITHM_SLOPE
+
+    def reset(self):
+        self._count = 0
+        self._sum = 0.0
+        self._weighted_sum = 0.0
+
+    def update(self, value: float, evicted=None):
+        if evicted is not None:
+            self._sum -= evicted
+            self._weighted_sum -= self._sum
+            self._count -= 1
+
+        self._weighted_sum += self._count * value
+        self._sum += value
+        self._count += 1
+
+    def slope(self) -> float:
+        """Return the slope per sample."""
+        n = self._count
+        if n < 2:
+            return 0.0
+        index_sum = n * (n - 1) / 2
+        index_square_sum = (n - 1) * n * (2 * n - 1) / 6
+        return (n * self._weighted_sum - index_sum * self._sum) / (n * index_square_sum - index_sum * index_sum)
+
+    def value(self):
+        if self._count < 2:
+            return None
+        return round(self.slope() * 3600 / self._interval, 2) + 0.0
+
+    def attributes(self):
+        return {"unit": "per hour"}
+
+
+class WindowMinMax(TrendAlgorithm):
+    """Range (max - min) over the window, kept with monotonic deques."""
+
+    name = ALGORITHM_MIN_MAX
+
+    def reset(self):
+        self._index = 0
+        self._oldest = 0  # Index of the oldest sample still in the window
+        self._minimums = deque()  # (index, value), values increasing
+        self._maximums = deque()  # (index, value), values decreasing
+
+    def update(self, value: float, evicted=None):
+        if evicted is not None:
+            self._oldest += 1
+        index = self._index
+        self._index += 1
+
+        while self._minimums and self._minimums[-1][1] >= value:
+            self._minimums.pop()
+        self._minimums.append((index, value))
+        while self._maximums and self._maximums[-1][1] <= value:
+            self._maximums.pop()
+        self._maximums.append((index, value))
+
+        while self._minimums[0][0] < self._oldest:
+            self._minimums.popleft()
+        while self._maximums[0][0] < self._oldest:
+            self._maximums.popleft()
+
+    def value(self):
+        if not self._minimums:
+            return None
+        return round(self._maximums[0][1] - self._minimums[0][1], 2) + 0.0
+
+    def attributes(self):
+        if not self._minimums:
+            return None
+        return {"min": self._minimums[0][1], "max": self._maximums[0][1]}
+
+
+ALGORITHMS = {algorithm.name: algorithm for algorithm in (EwmaDeviation, LinearSlope, WindowMinMax)}
@@ -0,0 +1,217 @@
+"""Vectorized trend computation for all tracked entities at once."""
+import numpy as np
+
+
+class BatchTrendEngine:
+    """Keep the samples of all entities in one (entities x window) matrix.
+
+    Every entity owns a row, which only moves when another entity is removed. Each
+    row is a ring buffer with its own write position, so entities that skip a tick
+    (unknown or non-numeric state) do not shift the samples of the others. Statistics for all rows are computed with a
+    single vectorized pass.
+
+    The matrix is allocated for all initial entities at once and grows geometrically,
+    so adding entities one by one stays amortized O(1) per entity. Only the first
+    ``len(entity_ids)`` rows are in use.
+    """
+
+    def __init__(self, entity_ids, window: int):
+        self._window = max(1, int(window))
+        self._entity_ids = list(dict.fromkeys(entity_ids))
+        self._slots = {entity_id: row for row, entity_id in enumerate(self._entity_ids)}
+        capacity = max(1, len(self._entity_ids))
+        self._values = np.zeros((capacity, self._window), dtype=np.float64)
+        self._positions = np.zeros(capacity, dtype=np.int64)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def window(self) -> int:
+        """Return the number of samples per row."""
+        return self._window
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the sample matrix and row counters, in bytes."""
+        return self._values.nbytes + self._positions.nbytes + self._counts.nbytes
+
+    def add(self, entity_id: str):
+        """Assign a row to a new entity."""
+        if entity_id in self._slots:
+            return
+        row = len(self._entity_ids)
+        if row == len(self._counts):
+            self._grow(2 * row)
+        self._slots[entity_id] = row
+        self._entity_ids.append(entity_id)
+        self.reset(row)
+
+    def _grow(self, capacity: int):
+        """Reallocate the matrix and row counters for ``capacity`` rows."""
+        rows = len(self._entity_ids)
+        values = np.zeros((capacity, self._window), dtype=np.float64)
+        values[:rows] = self._values[:rows]
+        positions = np.zeros(capacity, dtype=np.int64)
+        positions[:rows] = self._positions[:rows]
+        counts = np.zeros(capacity, dtype=np.int64)
+        counts[:rows] = self._counts[:rows]
+        self._values, self._positions, self._counts = values, positions, counts
+
+    def remove(self, entity_id: str):
+        """Drop the row of an entity, moving the last row in use into its place.
+
+        Only one row is copied, so removing is O(window) whatever the number of rows.
+        The capacity stays allocated and the freed row is reset when it is reused.
+        """
+        row = self._slots.pop(entity_id, None)
+        if row is None:
+            return
+        last = len(self._entity_ids) - 1
+        moved = self._entity_ids.pop()
+        if row != last:
+            self._values[row] = self._values[last]
+            self._positions[row] = self._positions[last]
+            self._counts[row] = self._counts[last]
+            self._entity_ids[row] = moved
+            self._slots[moved] = row
+
+    def resize(self, window: int):
+        """Change the number of samples per row, keeping the newest samples of every row."""
+        window = max(1, int(window))
+        if window == self._window:
+            return
+        kept = np.minimum(self._counts, window)
+        columns = np.arange(window)[None, :]
+        # Column j of the new matrix holds the j-th oldest of the kept samples
+        sources = (self._positions[:, None] - kept[:, None] + columns) % self._window
+        rows = np.arange(len(self._counts))[:, None]
+        self._values = np.where(columns < kept[:, None], self._values[rows, sources], 0.0)
+        self._positions = kept.copy()
+        self._counts = kept
+        self._window = window
+
+    def reset(self, rows=None):
+        """Clear the samples of the given rows, or of all rows."""
+        if rows is None:
+            rows = slice(None)
+        self._values[rows] = 0.0
+        self._positions[rows] = 0
+        self._counts[rows] = 0
+
+    def push(self, samples: dict):
+        """Append one sample for every entity in ``samples`` (entity_id -> float)."""
+        rows = np.fromiter((self._slots[entity_id] for entity_id in samples), dtype=np.int64, count=len(samples))
+        if not rows.size:
+            return
+        values = np.fromiter(samples.values(), dtype=np.float64, count=len(samples))
+        self._values[rows, self._positions[rows] % self._window] = values
+        self._positions[rows] += 1
+        self._counts[rows] = np.minimum(self._counts[rows] + 1, self._window)
+
+    def load(self, entity_id: str, values):
+        """Replace the samples of an entity with ``values`` (oldest first)."""
+        row = self._slots.get(entity_id)
+        if row is None:
+            return
+        values = list(values)[-self._window:]
+        self.reset(row)
+        self._values[row, :len(values)] = values
+        self._positions[row] = len(values)
+        self._counts[row] = len(values)
+
+    def count(self, entity_id: str) -> int:
+        """Return the number of samples buffered for an entity."""
+        row = self._slots.get(entity_id)
+        return 0 if row is None else int(self._counts[row])
+
+    def samples(self, entity_id: str) -> list:
+        """Return the samples of an entity, oldest first."""
+        row = self._slots.get(entity_id)
+        if row is None:
+            return []
+        count = int(self._counts[row])
+        indices = (self._positions[row] - count + np.arange(count)) % self._window
+        return self._values[row, indices].tolist()
+
+    def full_rows(self):
+        """Return a boolean mask of rows holding a complete window."""
+        return self._counts[:len(self._entity_ids)] == self._window
+
+    def filled_rows(self):
+        """Return a boolean mask of rows holding at least one sample."""
+        return self._counts[:len(self._entity_ids)] > 0
+
+    def snapshot(self, mask) -> "BatchSnapshot":
+        """Copy the rows selected by ``mask`` that hold samples, with their entity ids.
+
+        The copy stays valid when rows are added, removed or resized afterwards, so it
+        can be computed in another thread while the matrix keeps changing.
+        """
+        rows = np.flatnonzero(mask & (self._counts[:len(self._entity_ids)] > 0))
+        return BatchSnapshot(
+            [self._entity_ids[row] for row in rows.tolist()],
+            self._values[rows],  # Indexing with an array copies
+            self._counts[rows],
+            self._positions[rows],
+            self._window,
+        )
+
+    def compute(self, mask):
+        """Compute the statistics of the rows selected by ``mask``, see BatchSnapshot.compute."""
+        return self.snapshot(mask).compute()
+
+
+class BatchSnapshot:
+    """Copied rows of a BatchTrendEngine, computed without touching the engine."""
+
+    __slots__ = ("entity_ids", "values", "counts", "positions", "window")
+
+    def __init__(self, entity_ids, values, counts, positions, window: int):
+        self.entity_ids = entity_ids
+        self.values = values
+        self.counts = counts
+        self.positions = positions
+        self.window = window
+
+    def compute(self):
+        """Compute the statistics of every row.
+
+        Returns a list of (entity_id, trend, mean, slope, minimum, maximum) tuples,
+        where ``trend`` is the last sample minus the window mean rounded to two
+        decimals and ``slope`` is the least-squares slope per sample.
+        """
+        if not self.entity_ids:
+            return []
+
+        values = self.values
+        counts = self.counts
+        positions = self.positions
+        window = self.window
+        size = len(self.entity_ids)
+
+        # Age of every column: 0 is the oldest sample of a row, count - 1 the newest
+        starts = (positions - counts) % window
+        ages = (np.arange(window)[None, :] - starts[:, None]) % window
+        valid = ages < counts[:, None]
+
+        sums = np.where(valid, values, 0.0).sum(axis=1)
+        means = sums / counts
+        lasts = values[np.arange(size), (positions - 1) % window]
+        trends = np.round(lasts - means, 2) + 0.0  # Adding 0.0 turns -0.0 into 0.0
+
+        age_means = (counts - 1) / 2.0
+        dx = np.where(valid, ages - age_means[:, None], 0.0)
+        dy = np.where(valid, values - means[:, None], 0.0)
+        denominators = (dx * dx).sum(axis=1)
+        slopes = np.divide(
+            (dx * dy).sum(axis=1), denominators, out=np.zeros_like(denominators), where=denominators > 0
+        )
+
+        minimums = np.where(valid, values, np.inf).min(axis=1)
+        maximums = np.where(valid, values, -np.inf).max(axis=1)
+
+        return [
+            (entity_id, float(trend), float(mean), float(slope), float(minimum), float(maximum))
+            for entity_id, trend, mean, slope, minimum, maximum in zip(
+                self.entity_ids, trends, means, slopes, minimums, maximums
+            )
+        ]
@@ -0,0 +1,243 @@
+"""Sample buffers used by the BetterTrends manager."""
+from array import array
+import math
+import time
+
+
+class TrendBuffer:
+    """Fixed-size ring buffer of floats that keeps a running sum.
+
+    Samples are stored unboxed in an ``array("d")``. Appending evicts the oldest
+    sample once the buffer is full, so both ``append`` and ``mean`` run in constant
+    time regardless of the window size.
+    """
+
+    __slots__ = ("_values", "_capacity", "_start", "_count", "_sum")
+
+    def __init__(self, capacity: int):
+        self._capacity = max(1, int(capacity))
+        self._values = array("d", bytes(8 * self._capacity))
+        self._start = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def append(self, value: float):
+        """Add a sample and return the one it evicted, or None if the buffer was not full."""
+        evicted = None
+        if self._count < self._capacity:
+            index = (self._start + self._count) % self._capacity
+            self._count += 1
+        else:
+            index = self._start
+            evicted = self._values[index]
+            self._sum -= evicted
+            self._start = (self._start + 1) % self._capacity
+
+        self._values[index] = value
+        self._sum += value
+
+        if self._start == 0 and self._count == self._capacity:
+            # Once per wrap-around, recompute the sum to stop rounding errors from piling up
+            self._sum = math.fsum(self._values)
+
+        return evicted
+
+    def clear(self):
+        """Drop all samples."""
+        self._start = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def resize(self, capacity: int):
+        """Change the capacity, keeping the newest samples that still fit."""
+        values = list(self)[-max(1, int(capacity)):]
+        self._capacity = max(1, int(capacity))
+        self._values = array("d", bytes(8 * self._capacity))
+        self._values[:len(values)] = array("d", values)
+        self._start = 0
+        self._count = len(values)
+        self._sum = math.fsum(values)
+
+    def mean(self) -> float:
+        """Return the average of the buffered samples."""
+        return self._sum / self._count if self._count else 0.0
+
+    def last(self) -> float:
+        """Return the most recent sample."""
+        if not self._count:
+            raise IndexError("last() on an empty TrendBuffer")
+        return self._values[(self._start + self._count - 1) % self._capacity]
+
+    @property
+    def capacity(self) -> int:
+        """Return the maximum number of samples."""
+        return self._capacity
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the sample storage, in bytes."""
+        return self._values.itemsize * len(self._values)
+
+    @property
+    def full(self) -> bool:
+        """Return True if the buffer holds ``capacity`` samples."""
+        return self._count == self._capacity
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Iterate over the samples from oldest to newest."""
+        for offset in range(self._count):
+            yield self._values[(self._start + offset) % self._capacity]
+
+    def __repr__(self):
+        return f"TrendBuffer({list(self)!r}, capacity={self._capacity})"
+
+
+class TimeWindowBuffer:
+    """Timestamped samples covering a fixed time span, for time-weighted trends.
+
+    Timestamps (monotonic seconds) and values are kept in two parallel ``array("d")``
+    columns. Every sample holds its value until the next one (sample and hold), so a
+    sensor that reported once in ten minutes weighs ten minutes, no matter how many
+    ticks passed. Samples that fell out of the span are evicted lazily: the columns
+    are only compacted once the expired part outgrows the live part.
+    """
+
+    __slots__ = ("_times", "_values", "_head", "_span", "_origin")
+
+    def __init__(self, span: float):
+        self._times = array("d")
+        self._values = array("d")
+        self._head = 0  # Index of the oldest sample still needed
+        self._span = float(span)
+        self._origin = float("-inf")  # Start of the current tumbling window
+
+    def append(self, timestamp: float, value: float):
+        """Add a sample taken at the monotonic time ``timestamp``."""
+        self._times.append(timestamp)
+        self._values.append(value)
+        self._evict(timestamp)
+
+    def _evict(self, now: float):
+        """Drop samples that no longer influence the window ending at ``now``."""
+        start = now - self._span
+        times = self._times
+        # Keep the last sample at or before the window start, it holds the value carried into the window
+        while self._head + 1 < len(times) and times[self._head + 1] <= start:
+            self._head += 1
+        if self._head and self._head * 2 >= len(times):
+            del self._times[:self._head]
+            del self._values[:self._head]
+            self._head = 0
+
+    def _window_start(self, now: float) -> float:
+        return max(now - self._span, self._origin, self._times[self._head])
+
+    def clear(self, now: float = None):
+        """Start a new window at ``now``, carrying the latest value into it."""
+        now = time.monotonic() if now is None else now
+        if len(self):
+            self._times = array("d", [self._times[-1]])
+            self._values = array("d", [self._values[-1]])
+            self._head = 0
+        self._origin = now
+
+    def resize(self, span: float):
+        """Change the time span. A shorter span drops the samples that fell out of it on the next access."""
+        self._span = float(span)
+
+    def copy(self) -> "TimeWindowBuffer":
+        """Return an independent copy of the samples still needed, e.g. to read from another thread."""
+        buffer = TimeWindowBuffer(self._span)
+        buffer._times = self._times[self._head:]
+        buffer._values = self._values[self._head:]
+        buffer._origin = self._origin
+        return buffer
+
+    def mean(self, now: float = None) -> float:
+        """Return the time-weighted average over the window ending at ``now``."""
+        if not len(self):
+            return 0.0
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        start = self._window_start(now)
+        if now <= start:
+            return self._values[-1]
+
+        total = 0.0
+        times, values = self._times, self._values
+        for index in range(self._head, len(times)):
+            begin = max(times[index], start)
+            end = times[index + 1] if index + 1 < len(times) else now
+            if end > begin:
+                total += values[index] * (end - begin)
+        return total / (now - start)
+
+    def slope(self, now: float = None) -> float:
+        """Return the least-squares slope per second of the samples within the window."""
+        now = time.monotonic() if now is None else now
+        if not len(self):
+            return 0.0
+        self._evict(now)
+        start = self._window_start(now)
+        points = [
+            (max(timestamp, start) - start, value)
+            for timestamp, value in zip(self._times[self._head:], self._values[self._head:])
+        ]
+        if len(points) < 2:
+            return 0.0
+
+        count = len(points)
+        mean_time = sum(timestamp for timestamp, _ in points) / count
+        mean_value = sum(value for _, value in points) / count
+        variance = sum((timestamp - mean_time) ** 2 for timestamp, _ in points)
+        if not variance:
+            return 0.0
+        covariance = sum((timestamp - mean_time) * (value - mean_value) for timestamp, value in points)
+        return covariance / variance
+
+    def last(self) -> float:
+        """Return the most recent sample."""
+        if not len(self):
+            raise IndexError("last() on an empty TimeWindowBuffer")
+        return self._values[-1]
+
+    @property
+    def newest(self):
+        """Return the timestamp of the most recent sample, or None without samples."""
+        return self._times[-1] if len(self) else None
+
+    @property
+    def span(self) -> float:
+        """Return the time span of the window, in seconds."""
+        return self._span
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the sample storage, in bytes."""
+        return (self._times.itemsize + self._values.itemsize) * len(self._times)
+
+    @property
+    def full(self) -> bool:
+        """Return True if the samples cover the whole time span."""
+        return self.covers()
+
+    def covers(self, now: float = None) -> bool:
+        """Return True if the samples cover the whole time span of the window ending at ``now``."""
+        if not len(self):
+            return False
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        return now - max(self._origin, self._times[self._head]) >= self._span
+
+    def __len__(self):
+        return len(self._times) - self._head
+
+    def __iter__(self):
+        """Iterate over the (timestamp, value) pairs from oldest to newest."""
+        return zip(self._times[self._head:], self._values[self._head:])
+
+    def __repr__(self):
+        return f"TimeWindowBuffer({list(self)!r}, span={self._span})"
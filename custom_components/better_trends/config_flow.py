@@ -1,7 +1,20 @@
 from homeassistant import config_entries
+from homeassistant.core import callback
 import voluptuous as vol
 from homeassistant.helpers import selector
-from .const import DOMAIN
+from homeassistant.util import slugify
+from .const import DOMAIN, CONF_ENTITIES, CONF_UPDATE_MODE, DEFAULT_UPDATE_MODE, UPDATE_MODE_POLLING, UPDATE_MODE_EVENT, \
+    CONF_WINDOW_MODE, DEFAULT_WINDOW_MODE, WINDOW_MODE_TUMBLING, WINDOW_MODE_ROLLING, CONF_ENGINE, DEFAULT_ENGINE, \
+    ENGINE_PYTHON, ENGINE_NUMPY, CONF_BACKFILL, DEFAULT_BACKFILL, CONF_SCHEDULES, CONF_INTERVAL, CONF_STEPS, \
+    CONF_STAGGER_SHARDS, DEFAULT_STAGGER_SHARDS, CONF_DEADBAND_ABS, CONF_DEADBAND_REL, CONF_MIN_PUBLISH_INTERVAL, \
+    CONF_HEARTBEAT, CONF_MISSED_TICK_POLICY, DEFAULT_MISSED_TICK_POLICY, MISSED_TICK_CATCH_UP, MISSED_TICK_SKIP, \
+    CONF_PROFILING, CONF_ALGORITHMS, CONF_ALGORITHM, ALGORITHM_MEAN_DELTA, ALGORITHM_EWMA, ALGORITHM_SLOPE, ALGORITHM_MIN_MAX, \
+    CONF_TIME_WEIGHTED, CONF_EXECUTION_MODE, DEFAULT_EXECUTION_MODE, EXECUTION_MODE_LOOP, EXECUTION_MODE_EXECUTOR, \
+    CONF_GROUP, CONF_PATTERN, CONF_DEVICE_CLASS, CONF_AREAS, CONF_LABELS, CONF_STATISTICS
+from .selection import SensorIndex
+
+# How many of the selected entities the form lists by name
+SELECTION_PREVIEW = 10
 
 
 class BetterTrendsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -11,54 +24,72 @@ class BetterTrendsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     def __init__(self):
         self.entities = []  # Store entities dynamically added by the user
+        self.group = ""  # Name of the group the entities go to, empty for the default group
+        self._selected = set()  # Same entities as a set, for membership tests
+        self._index = None  # SensorIndex, built on the first form
 
     async def async_step_user(self, user_input=None):
-        """Handle the step where entities are added."""
+        """Handle the step where entities are added, one at a time or many by pattern, device class, area or label."""
         errors = {}
-
-        # Preload previously configured entities
-        if not self.entities:
-            existing_entries = [
-                entry for entry in self.hass.config_entries.async_entries(DOMAIN)
-            ]
-            if existing_entries:
-                self.entities = existing_entries[0].data.get("entities", [])
+        if self._index is None:
+            self._index = SensorIndex(self.hass)
 
         if user_input is not None:
             new_entity = user_input.get("entity")
+            self.group = user_input.get(CONF_GROUP, "").strip()
+            criteria = {
+                "pattern": user_input.get(CONF_PATTERN, "").strip().lower(),
+                "device_class": user_input.get(CONF_DEVICE_CLASS),
+                "areas": user_input.get(CONF_AREAS, []),
+                "labels": user_input.get(CONF_LABELS, []),
+            }
+            bulk = any(criteria.values())
+            tracked = {
+                entity_id for entry in self._async_current_entries() for entity_id in entry.data.get(CONF_ENTITIES, [])
+            }
 
+            matched = self._index.select(**criteria)
             if new_entity:
                 # Validate the entered entity
-                if new_entity in self.hass.states.async_entity_ids("sensor"):
-                    if new_entity not in self.entities:
-                        self.entities.append(new_entity)  # Add to the list of valid entities
-                else:
+                if new_entity not in self._index:
                     errors["entity"] = "invalid_entity"
-            else:
+                elif new_entity in tracked:
+                    errors["entity"] = "already_tracked"  # Every entity belongs to one group
+                else:
+                    matched.add(new_entity)
+
+            # Entities of other groups are left out of bulk selections
+            added = sorted(matched - tracked - self._selected)
+            self.entities.extend(added)
+            self._selected.update(added)
+            if bulk and not added:
+                errors["base"] = "no_matches"
+
+            if not new_entity and not bulk:
                 # Finalize configuration if no new entity is provided
                 if self.entities:
-                    existing_entries = [
-                        entry for entry in self.hass.config_entries.async_entries(DOMAIN)
-                    ]
-                    if existing_entries:
-                        entry = existing_entries[0]
-
+                    group = slugify(self.group) if self.group else None
+                    entry = next(
+                        (
+                            entry for entry in self._async_current_entries()
+                            if entry.data.get(CONF_GROUP) == group
+                        ),
+                        None,
+                    )
+                    if entry:
                         # Merge existing entities with new ones
                         updated_entities = list(set(entry.data["entities"] + self.entities))
                         new_data = {**entry.data, "entities": updated_entities}
 
-                        # Update the entry with the new data
+                        # The update listener adds the new entities to the running manager of the group
                         self.hass.config_entries.async_update_entry(entry, data=new_data)
-
-                        # Reload the entry to apply changes
-                        await self.hass.config_entries.async_reload(entry.entry_id)
                         return self.async_abort(reason="reconfigure_successful")
-                    else:
-                        # Create a new entry if none exists
-                        return self.async_create_entry(
-                            title="BetterTrends",
-                            data={"entities": self.entities},
-                        )
+
+                    # A new group gets a config entry, and so a manager, of its own
+                    data = {"entities": self.entities}
+                    if group:
+                        data[CONF_GROUP] = group
+                    return self.async_create_entry(title=self.group or "BetterTrends", data=data)
 
                 errors["entity"] = "no_entities"
 
@@ -66,23 +97,247 @@ class BetterTrendsConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         schema = self._build_schema()
 
         # Show the form with errors (if any)
+        preview = ", ".join(self.entities[-SELECTION_PREVIEW:])
+        if len(self.entities) > SELECTION_PREVIEW:
+            preview = f"..., {preview}"
         return self.async_show_form(
             step_id="user",
             data_schema=schema,
             errors=errors,
+            description_placeholders={"count": str(len(self.entities)), "selected": preview or "none"},
         )
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for BetterTrends."""
+        return BetterTrendsOptionsFlow(config_entry)
+
     def _build_schema(self):
-        """Build the schema with a selector for entity search."""
-        schema = {}
+        """Build the schema with a selector for entity search and the bulk selection criteria.
+
+        The entities selected so far are listed in the description, so the schema does
+        not grow with every entity added.
+        """
+        return vol.Schema(
+            {
+                vol.Optional(CONF_GROUP, default=self.group): str,
+                vol.Optional("entity"): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
+                vol.Optional(CONF_PATTERN): str,
+                vol.Optional(CONF_DEVICE_CLASS): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=sorted(self._index.device_classes),
+                        mode=selector.SelectSelectorMode.DROPDOWN,
+                    )
+                ),
+                vol.Optional(CONF_AREAS): selector.AreaSelector(selector.AreaSelectorConfig(multiple=True)),
+                vol.Optional(CONF_LABELS): selector.LabelSelector(selector.LabelSelectorConfig(multiple=True)),
+            }
+        )
+
+
+class BetterTrendsOptionsFlow(config_entries.OptionsFlow):
+    """Handle BetterTrends options."""
+
+    def __init__(self, config_entry):
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Let the user pick which options to manage."""
+        return self.async_show_menu(step_id="init", menu_options=["settings", "schedules", "algorithms", "remove"])
+
+    async def async_step_settings(self, user_input=None):
+        """Manage the trend engine options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data={**self._entry.options, **user_input})
+
+        options = self._entry.options
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_UPDATE_MODE, default=options.get(CONF_UPDATE_MODE, DEFAULT_UPDATE_MODE)
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[UPDATE_MODE_POLLING, UPDATE_MODE_EVENT],
+                        translation_key=CONF_UPDATE_MODE,
+                    )
+                ),
+                vol.Required(
+                    CONF_WINDOW_MODE, default=options.get(CONF_WINDOW_MODE, DEFAULT_WINDOW_MODE)
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[WINDOW_MODE_TUMBLING, WINDOW_MODE_ROLLING],
+                        translation_key=CONF_WINDOW_MODE,
+                    )
+                ),
+                vol.Required(
+                    CONF_ENGINE, default=options.get(CONF_ENGINE, DEFAULT_ENGINE)
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[ENGINE_PYTHON, ENGINE_NUMPY],
+                        translation_key=CONF_ENGINE,
+                    )
+                ),
+                vol.Required(
+                    CONF_EXECUTION_MODE, default=options.get(CONF_EXECUTION_MODE, DEFAULT_EXECUTION_MODE)
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[EXECUTION_MODE_LOOP, EXECUTION_MODE_EXECUTOR],
+                        translation_key=CONF_EXECUTION_MODE,
+                    )
+                ),
+                vol.Required(
+                    CONF_BACKFILL, default=options.get(CONF_BACKFILL, DEFAULT_BACKFILL)
+                ): selector.BooleanSelector(),
+                vol.Required(
+                    CONF_TIME_WEIGHTED, default=options.get(CONF_TIME_WEIGHTED, False)
+                ): selector.BooleanSelector(),
+                vol.Required(
+                    CONF_STAGGER_SHARDS, default=options.get(CONF_STAGGER_SHARDS, DEFAULT_STAGGER_SHARDS)
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(min=1, max=60, step=1, mode=selector.NumberSelectorMode.BOX)
+                ),
+                vol.Required(
+                    CONF_MISSED_TICK_POLICY, default=options.get(CONF_MISSED_TICK_POLICY, DEFAULT_MISSED_TICK_POLICY)
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[MISSED_TICK_SKIP, MISSED_TICK_CATCH_UP],
+                        translation_key=CONF_MISSED_TICK_POLICY,
+                    )
+                ),
+                vol.Required(CONF_DEADBAND_ABS, default=options.get(CONF_DEADBAND_ABS, 0)): selector.NumberSelector(
+                    selector.NumberSelectorConfig(min=0, max=1000, step="any", mode=selector.NumberSelectorMode.BOX)
+                ),
+                vol.Required(CONF_DEADBAND_REL, default=options.get(CONF_DEADBAND_REL, 0)): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0, max=100, step="any", unit_of_measurement="%", mode=selector.NumberSelectorMode.BOX
+                    )
+                ),
+                vol.Required(
+                    CONF_MIN_PUBLISH_INTERVAL, default=options.get(CONF_MIN_PUBLISH_INTERVAL, 0)
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0, max=86400, step=1, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX
+                    )
+                ),
+                vol.Required(CONF_HEARTBEAT, default=options.get(CONF_HEARTBEAT, 0)): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0, max=86400, step=1, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX
+                    )
+                ),
+                vol.Required(CONF_PROFILING, default=options.get(CONF_PROFILING, False)): selector.BooleanSelector(),
+                vol.Required(
+                    CONF_STATISTICS, default=options.get(CONF_STATISTICS, False)
+                ): selector.BooleanSelector(),
+            }
+        )
+
+        return self.async_show_form(step_id="settings", data_schema=schema)
+
+    async def async_step_schedules(self, user_input=None):
+        """Give entities an interval and steps of their own."""
+        schedules = dict(self._entry.options.get(CONF_SCHEDULES, {}))
 
-        # Add previously entered entities as non-editable fields
-        for i, entity in enumerate(self.entities):
-            schema[vol.Optional(f"entity_{i}", default=entity)] = str
+        if user_input is not None:
+            interval = int(user_input.get(CONF_INTERVAL, 0))
+            steps = int(user_input.get(CONF_STEPS, 0))
+            for entity_id in user_input.get(CONF_ENTITIES, []):
+                if interval and steps:
+                    schedules[entity_id] = {CONF_INTERVAL: interval, CONF_STEPS: steps}
+                else:
+                    schedules.pop(entity_id, None)  # 0 means back to the global settings
+            return self.async_create_entry(title="", data={**self._entry.options, CONF_SCHEDULES: schedules})
+
+        schema = vol.Schema(
+            {
+                vol.Required(CONF_ENTITIES): selector.EntitySelector(
+                    selector.EntitySelectorConfig(
+                        include_entities=self._entry.data.get(CONF_ENTITIES, []),
+                        multiple=True,
+                    )
+                ),
+                vol.Required(CONF_INTERVAL, default=0): selector.NumberSelector(
+                    selector.NumberSelectorConfig(min=0, max=9999, step=1, mode=selector.NumberSelectorMode.BOX)
+                ),
+                vol.Required(CONF_STEPS, default=0): selector.NumberSelector(
+                    selector.NumberSelectorConfig(min=0, max=1000, step=1, mode=selector.NumberSelectorMode.BOX)
+                ),
+            }
+        )
 
-        # Add an entity selector for the next entity
-        schema[vol.Optional("entity")] = selector.EntitySelector(
-            selector.EntitySelectorConfig(domain="sensor")
+        overrides = ", ".join(
+            f"{entity_id} ({schedule[CONF_INTERVAL]}s x {schedule[CONF_STEPS]})"
+            for entity_id, schedule in schedules.items()
+        )
+        return self.async_show_form(
+            step_id="schedules",
+            data_schema=schema,
+            description_placeholders={"overrides": overrides or "none"},
         )
 
-        return vol.Schema(schema)
+    async def async_step_algorithms(self, user_input=None):
+        """Choose the trend algorithm of individual entities."""
+        algorithms = dict(self._entry.options.get(CONF_ALGORITHMS, {}))
+
+        if user_input is not None:
+            algorithm = user_input[CONF_ALGORITHM]
+            for entity_id in user_input.get(CONF_ENTITIES, []):
+                if algorithm == ALGORITHM_MEAN_DELTA:
+                    algorithms.pop(entity_id, None)  # The default needs no entry
+                else:
+                    algorithms[entity_id] = algorithm
+            return self.async_create_entry(title="", data={**self._entry.options, CONF_ALGORITHMS: algorithms})
+
+        schema = vol.Schema(
+            {
+                vol.Required(CONF_ENTITIES): selector.EntitySelector(
+                    selector.EntitySelectorConfig(
+                        include_entities=self._entry.data.get(CONF_ENTITIES, []),
+                        multiple=True,
+                    )
+                ),
+                vol.Required(CONF_ALGORITHM, default=ALGORITHM_MEAN_DELTA): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=[ALGORITHM_MEAN_DELTA, ALGORITHM_EWMA, ALGORITHM_SLOPE, ALGORITHM_MIN_MAX],
+                        translation_key=CONF_ALGORITHM,
+                    )
+                ),
+            }
+        )
+
+        selected = ", ".join(f"{entity_id} ({algorithm})" for entity_id, algorithm in algorithms.items())
+        return self.async_show_form(
+            step_id="algorithms",
+            data_schema=schema,
+            description_placeholders={"algorithms": selected or "none"},
+        )
+
+    async def async_step_remove(self, user_input=None):
+        """Stop calculating the trend of the selected entities."""
+        errors = {}
+        entities = self._entry.data.get(CONF_ENTITIES, [])
+
+        if user_input is not None:
+            removed = set(user_input.get(CONF_ENTITIES, []))
+            kept = [entity_id for entity_id in entities if entity_id not in removed]
+            if not kept:
+                errors[CONF_ENTITIES] = "no_entities"  # Remove the whole group by deleting its entry instead
+            else:
+                # The update listener removes the trend sensors from the running manager
+                self.hass.config_entries.async_update_entry(self._entry, data={**self._entry.data, CONF_ENTITIES: kept})
+                options = dict(self._entry.options)
+                for key in (CONF_SCHEDULES, CONF_ALGORITHMS):
+                    if key in options:
+                        options[key] = {
+                            entity_id: value for entity_id, value in options[key].items() if entity_id not in removed
+                        }
+                return self.async_create_entry(title="", data=options)
+
+        schema = vol.Schema(
+            {
+                vol.Required(CONF_ENTITIES): selector.EntitySelector(
+                    selector.EntitySelectorConfig(include_entities=entities, multiple=True)
+                ),
+            }
+        )
+        return self.async_show_form(step_id="remove", data_schema=schema, errors=errors)
@@ -4,4 +4,83 @@ DEFAULT_INTERVAL = 12
 DEFAULT_TREND_VALUES = 10
 TREND_INTERVAL_ENTITY = "number.bettertrends_interval"
 TREND_VALUES_ENTITY = "number.bettertrends_steps"
-TREND_COUNTER_ENTITY = "number.bettertrends_current_step"
\ No newline at end of file
+TREND_COUNTER_ENTITY = "number.bettertrends_current_step"
+
+CONF_UPDATE_MODE = "update_mode"
+UPDATE_MODE_POLLING = "polling"
+UPDATE_MODE_EVENT = "event"
+DEFAULT_UPDATE_MODE = UPDATE_MODE_POLLING
+
+CONF_WINDOW_MODE = "window_mode"
+WINDOW_MODE_TUMBLING = "tumbling"
+WINDOW_MODE_ROLLING = "rolling"
+DEFAULT_WINDOW_MODE = WINDOW_MODE_TUMBLING
+
+CONF_ENGINE = "engine"
+ENGINE_PYTHON = "python"
+ENGINE_NUMPY = "numpy"
+DEFAULT_ENGINE = ENGINE_PYTHON
+
+CONF_EXECUTION_MODE = "execution_mode"
+EXECUTION_MODE_LOOP = "loop"
+EXECUTION_MODE_EXECUTOR = "executor"
+DEFAULT_EXECUTION_MODE = EXECUTION_MODE_LOOP
+
+STORAGE_KEY = f"{DOMAIN}.snapshot"
+STORAGE_VERSION = 1
+SAVE_DELAY = 60
+
+CONF_BACKFILL = "backfill"
+DEFAULT_BACKFILL = False
+
+CONF_SCHEDULES = "schedules"
+CONF_INTERVAL = "interval"
+CONF_STEPS = "steps"
+
+CONF_STAGGER_SHARDS = "stagger_shards"
+DEFAULT_STAGGER_SHARDS = 1
+
+CONF_DEADBAND_ABS = "deadband_abs"
+CONF_DEADBAND_REL = "deadband_rel"
+CONF_MIN_PUBLISH_INTERVAL = "min_publish_interval"
+CONF_HEARTBEAT = "heartbeat"
+
+CONF_MISSED_TICK_POLICY = "missed_tick_policy"
+MISSED_TICK_CATCH_UP = "catch_up"
+MISSED_TICK_SKIP = "skip"
+DEFAULT_MISSED_TICK_POLICY = MISSED_TICK_SKIP
+MAX_CATCH_UP_TICKS = 10
+
+CONF_PROFILING = "profiling"
+STATS_UPDATE_INTERVAL = 10
+
+CONF_ALGORITHMS = "algorithms"
+CONF_ALGORITHM = "algorithm"
+ALGORITHM_MEAN_DELTA = "mean_delta"
+ALGORITHM_EWMA = "ewma"
+ALGORITHM_SLOPE = "slope"
+ALGORITHM_MIN_MAX = "min_max"
+
+CONF_TIME_WEIGHTED = "time_weighted"
+
+DEFAULT_SERIES_POINTS = 60
+DEFAULT_SERIES_HOURS = 24
+MAX_SERIES_POINTS = 1000
+
+DATA_NUMBERS_READY = f"{DOMAIN}_numbers_ready"
+NUMBERS_READY_TIMEOUT = 30
+
+CONF_GROUP = "group"
+DATA_COORDINATOR = f"{DOMAIN}_coordinator"
+MAX_STAGGER_SHARDS = 60
+MIN_BUCKET_ENTITIES = 50
+
+CONF_PATTERN = "pattern"
+CONF_DEVICE_CLASS = "device_class"
+CONF_AREAS = "areas"
+CONF_LABELS = "labels"
+
+MAX_REPLAY_RESPONSE_ROWS = 10000
+
+CONF_STATISTICS = "statistics"
+STATISTICS_PUBLISH_MINUTE = 1  # Minute past every hour the completed hour is published
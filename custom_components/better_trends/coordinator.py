@@ -0,0 +1,102 @@
+"""Coordination of the BetterTrends managers, one per config entry."""
+import logging
+import math
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+
+from .const import CONF_GROUP, MAX_STAGGER_SHARDS, MIN_BUCKET_ENTITIES, STORAGE_KEY, TREND_COUNTER_ENTITY, \
+    TREND_INTERVAL_ENTITY, TREND_VALUES_ENTITY
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GroupIds:
+    """Names, entity ids and storage key of the manager of one config entry.
+
+    Entries without a group, such as the one created before groups existed, keep
+    the ids BetterTrends always used, so their entities and snapshot carry over.
+    """
+
+    __slots__ = ("entry_id", "group", "label", "interval", "steps", "counter", "storage_key")
+
+    def __init__(self, entry: ConfigEntry = None):
+        self.entry_id = entry.entry_id if entry else None
+        self.group = entry.data.get(CONF_GROUP) if entry else None
+        if self.group:
+            self.label = f"BetterTrends {entry.title}"
+            self.interval = f"number.bettertrends_{self.group}_interval"
+            self.steps = f"number.bettertrends_{self.group}_steps"
+            self.counter = f"number.bettertrends_{self.group}_current_step"
+            self.storage_key = f"{STORAGE_KEY}_{self.group}"
+        else:
+            self.label = "BetterTrends"
+            self.interval = TREND_INTERVAL_ENTITY
+            self.steps = TREND_VALUES_ENTITY
+            self.counter = TREND_COUNTER_ENTITY
+            self.storage_key = STORAGE_KEY
+
+    def __repr__(self):
+        return f"GroupIds({self.group!r})"
+
+
+class BetterTrendsCoordinator:
+    """Balances the load of the managers of all config entries.
+
+    Every manager keeps its own schedule, task and snapshot, so a reload or an error
+    only affects its own group. The coordinator spreads their work: managers tick at
+    different phases of their interval, and managers with many entities get more
+    stagger buckets, so every tick samples about as many entities as the smallest
+    group does and one large group cannot hold up the event loop for the others.
+    """
+
+    def __init__(self):
+        self._managers = {}  # Config entry id -> BetterTrendsManager, in registration order
+
+    def register(self, entry_id: str, manager):
+        """Add the manager of a config entry and rebalance."""
+        self._managers[entry_id] = manager
+        self.rebalance()
+
+    def unregister(self, entry_id: str):
+        """Drop the manager of an unloaded config entry and rebalance the others."""
+        if self._managers.pop(entry_id, None) is not None:
+            self.rebalance()
+
+    def manager_of(self, entity_id: str):
+        """Return the manager tracking an entity, if any."""
+        for manager in self._managers.values():
+            if manager.tracks(entity_id):
+                return manager
+        return None
+
+    def rollups(self, sensor_entity_id: str):
+        """Return the rollups of a trend sensor, if its manager keeps any."""
+        for manager in self._managers.values():
+            rollups = manager.rollups(sensor_entity_id)
+            if rollups is not None:
+                return rollups
+        return None
+
+    @callback
+    def rebalance(self):
+        """Give every manager its stagger buckets and the phase its ticks start at."""
+        managers = list(self._managers.values())
+        if not managers:
+            return
+
+        # The smallest bucket any group has on its own settings, but not smaller than MIN_BUCKET_ENTITIES
+        target = max(
+            MIN_BUCKET_ENTITIES,
+            min(math.ceil(manager.entity_count / manager.stagger_shards) for manager in managers),
+        )
+        for index, manager in enumerate(managers):
+            shards = min(MAX_STAGGER_SHARDS, max(manager.stagger_shards, math.ceil(manager.entity_count / target)))
+            manager.set_balance(shards, index / len(managers))
+        _LOGGER.debug(
+            "Balanced %d BetterTrends managers to about %d entities per bucket: %s",
+            len(managers), target, ", ".join(f"{manager.name} ({manager.entity_count})" for manager in managers),
+        )
+
+    def __len__(self):
+        return len(self._managers)
@@ -0,0 +1,15 @@
+"""Diagnostics of the BetterTrends integration."""
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_ENTITIES
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return the options of a config entry and the diagnostics of its trend engine."""
+    manager = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    return {
+        "options": dict(entry.options),
+        "entities": len(entry.data.get(CONF_ENTITIES, [])),
+        "manager": manager.diagnostics() if manager is not None else None,
+    }
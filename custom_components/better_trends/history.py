@@ -0,0 +1,77 @@
+"""Read recorder history to seed trend buffers and to draw trend series."""
+from bisect import bisect_right
+from functools import partial
+import logging
+
+from homeassistant.components.recorder import get_instance, history
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_get_history_samples(hass: HomeAssistant, entity_ids, start_time, end_time) -> dict:
+    """Return the recorded states of all entities between start and end.
+
+    All entities are fetched with a single recorder query, executed in the recorder's
+    executor. The result maps each entity_id to a list of (timestamp, value) tuples
+    sorted by time, where value is None for non-numeric states.
+    """
+    if "recorder" not in hass.config.components or not entity_ids:
+        return {}
+
+    states = await get_instance(hass).async_add_executor_job(
+        partial(
+            history.get_significant_states,
+            hass,
+            start_time,
+            end_time,
+            list(entity_ids),
+            include_start_time_state=True,
+            significant_changes_only=False,
+            no_attributes=True,
+        )
+    )
+
+    samples = {}
+    for entity_id, entity_states in states.items():
+        points = []
+        for state in entity_states:
+            try:
+                value = float(state.state)
+            except (ValueError, TypeError):
+                value = None
+            points.append((state.last_updated.timestamp(), value))
+        samples[entity_id] = points
+
+    _LOGGER.debug("Fetched history for %d of %d entities.", len(samples), len(entity_ids))
+    return samples
+
+
+def resample(points, tick_times) -> list[float]:
+    """Return the values the polling loop would have sampled at the given tick times."""
+    times = [timestamp for timestamp, _ in points]
+    values = []
+    for tick in tick_times:
+        index = bisect_right(times, tick) - 1
+        if index >= 0 and points[index][1] is not None:
+            values.append(points[index][1])
+    return values
+
+
+def downsample(points, start: float, end: float, count: int) -> list:
+    """Return ``count`` evenly spaced (timestamp, value) points between start and end.
+
+    Every point carries the value recorded last before it. Points without a numeric
+    value at their time are left out.
+    """
+    if count < 1 or not points:
+        return []
+    step = (end - start) / max(count - 1, 1)
+    times = [timestamp for timestamp, _ in points]
+    series = []
+    for index in range(count):
+        tick = start + step * index
+        position = bisect_right(times, tick) - 1
+        if position >= 0 and points[position][1] is not None:
+            series.append((round(tick, 3), points[position][1]))
+    return series
@@ -0,0 +1,65 @@
+"""Publish the hourly trend rollups as long-term statistics of the recorder."""
+import logging
+import time
+
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .record import TrackedEntity
+
+try:
+    from homeassistant.components.recorder.models import StatisticMeanType
+except ImportError:  # Before Home Assistant 2025.4 statistics only had has_mean
+    StatisticMeanType = None
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def statistic_id(record: TrackedEntity) -> str:
+    """Return the id of the external statistic of a trend, such as better_trends:bettertrends_sensor_outdoor."""
+    return f"{DOMAIN}:{record.sensor_entity_id.split('.', 1)[1]}"
+
+
+def _metadata(hass: HomeAssistant, record: TrackedEntity) -> dict:
+    state = hass.states.get(record.entity_id)
+    metadata = {
+        "source": DOMAIN,
+        "statistic_id": statistic_id(record),
+        "name": f"BetterTrends {record.entity_id}",
+        "unit_of_measurement": state.attributes.get("unit_of_measurement") if state else None,
+        "has_mean": True,
+        "has_sum": False,
+    }
+    if StatisticMeanType is not None:
+        metadata["mean_type"] = StatisticMeanType.ARITHMETIC
+    return metadata
+
+
+def async_publish_rollups(hass: HomeAssistant, records) -> int:
+    """Import the completed hours of every trend's rollups, and return how many were imported.
+
+    The recorder writes them in its own thread and derives daily, weekly and monthly
+    statistics from them, so long-range charts read one row per hour and trend.
+    """
+    now = time.time()
+    imported = 0
+    for record in records:
+        if record.rollups is None:
+            continue
+        hours = record.rollups.closed_hours(now)
+        if not hours:
+            continue
+        async_add_external_statistics(
+            hass,
+            _metadata(hass, record),
+            [
+                {"start": dt_util.utc_from_timestamp(start), "min": minimum, "mean": mean, "max": maximum}
+                for start, minimum, mean, maximum in hours
+            ],
+        )
+        imported += len(hours)
+    if imported:
+        _LOGGER.debug("Imported %d hourly trend statistics.", imported)
+    return imported
@@ -2,6 +2,17 @@ class TrendCardLite extends HTMLElement {
     constructor() {
         super();
         this.lastStates = {};
+        this._states = {}; // Latest states of the configured sensors, pushed by the integration
+        this._series = {};
+        this._subscription = undefined; // Promise of the unsubscribe function, null if unavailable
+    }
+
+    connectedCallback() {
+        if (this._hass && this._subscription === undefined) this._subscribe();
+    }
+
+    disconnectedCallback() {
+        this._unsubscribe();
     }
 
     setConfig(config) {
@@ -144,6 +155,14 @@ class TrendCardLite extends HTMLElement {
                     opacity: 0.1;
                 }
 
+                .sparkline {
+                    width: 40px;
+                    height: 20px;
+                    margin-left: 5px;
+                    color: ${theme.textColor};
+                    opacity: 0.6;
+                }
+
             </style>
 
             <div class="main-container">
@@ -152,6 +171,12 @@ class TrendCardLite extends HTMLElement {
         `;
 
         this.renderMetrics();
+
+        // Resubscribe for the sensors of the new config
+        if (this._subscription !== undefined) {
+            this._unsubscribe();
+            this._subscribe();
+        }
     }
 
     renderMetrics() {
@@ -188,28 +213,109 @@ class TrendCardLite extends HTMLElement {
                     <svg class="indicator-equal indicator-dimmed" id="${metricId}-equal" width="18" height="18" viewBox="0 0 24 24"><path fill="#4ff24b" d="M5 11h14v2H5z"/></svg>
                     <svg class="indicator-up indicator-dimmed" id="${metricId}-up" width="18" height="18" viewBox="0 0 24 24"><path fill="#ff4c4c" d="M12 8l6 6H6z"/></svg>
                 </div>
+                ${this.config.sparkline ? `
+                <svg class="sparkline" viewBox="0 0 100 20" preserveAspectRatio="none">
+                    <polyline id="${metricId}-sparkline" fill="none" stroke="currentColor" stroke-width="2" points=""/>
+                </svg>` : ""}
             </div>
         `;
     }
 
     set hass(hass) {
+        this._hass = hass;
+        if (this._subscription === undefined) {
+            this._subscribe();
+        }
+        if (this._subscription === null) {
+            this._update(hass.states);
+        }
+        // While subscribed, updates of other entities in HA do not re-render the card
+    }
+
+    _entityIds() {
+        return [this.config.metric1_delta, this.config.metric2_delta, this.config.metric3_delta].filter(Boolean);
+    }
+
+    _subscribe() {
+        const entityIds = this._entityIds();
+        if (!this._hass || !this.isConnected || entityIds.length === 0) return;
+
+        this._subscription = this._hass.connection
+            .subscribeMessage((message) => this._handleMessage(message), {
+                type: "better_trends/subscribe",
+                entity_ids: entityIds,
+                points: this.config.sparkline ? this.config.sparkline_points || 60 : 0,
+                hours: this.config.sparkline_hours || 24,
+            })
+            .catch((error) => {
+                // Integration without the websocket API, read hass.states on every update instead
+                console.warn("BetterTrends: live updates unavailable, using hass.states.", error);
+                this._subscription = null;
+                if (this._hass) this._update(this._hass.states);
+            });
+    }
+
+    _unsubscribe() {
+        if (this._subscription) {
+            this._subscription.then((unsubscribe) => unsubscribe && unsubscribe());
+        }
+        this._subscription = undefined;
+    }
+
+    _handleMessage(message) {
+        if (message.series) {
+            this._series = { ...this._series, ...message.series };
+        }
+        const changes = message.states || message.updates || {};
+        const maxPoints = this.config.sparkline_points || 60;
+        for (const [entityId, state] of Object.entries(changes)) {
+            this._states[entityId] = state;
+            const series = this._series[entityId];
+            if (message.updates && state && series && !isNaN(parseFloat(state.state))) {
+                series.push([state.last_updated, parseFloat(state.state)]);
+                if (series.length > maxPoints) series.splice(0, series.length - maxPoints);
+            }
+        }
+        this._update(this._states);
+        if (this.config.sparkline) this._renderSparklines();
+    }
+
+    _renderSparklines() {
+        const metrics = { metric1: this.config.metric1_delta, metric2: this.config.metric2_delta, metric3: this.config.metric3_delta };
+        for (const [metricId, entityId] of Object.entries(metrics)) {
+            const line = this.shadowRoot.getElementById(`${metricId}-sparkline`);
+            if (!line) continue;
+            const values = (this._series[entityId] || []).map((point) => point[1]);
+            if (values.length < 2) {
+                line.setAttribute("points", "");
+                continue;
+            }
+            const min = Math.min(...values);
+            const range = Math.max(...values) - min || 1;
+            line.setAttribute("points", values
+                .map((value, index) => `${(index / (values.length - 1)) * 100},${20 - ((value - min) / range) * 20}`)
+                .join(" "));
+        }
+    }
+
+    _update(states) {
         const newState = {};
         let hasChanges = false;
 
         if (this.config.metric1_delta) {
-            newState.metric1Delta = hass.states[this.config.metric1_delta]?.state || "0.0";
+            newState.metric1Delta = states[this.config.metric1_delta]?.state || "0.0";
             hasChanges = hasChanges || this.lastStates.metric1Delta !== newState.metric1Delta;
             this.shadowRoot.getElementById("metric1").onclick = () =>
                 this._showMoreInfo(this.config.metric1_delta);
         }
         if (this.config.metric2_delta) {
-            newState.metric2Delta = hass.states[this.config.metric2_delta]?.state || "0.0";
+            newState.metric2Delta = states[this.config.metric2_delta]?.state || "0.0";
             hasChanges = hasChanges || this.lastStates.metric2Delta !== newState.metric2Delta;
             this.shadowRoot.getElementById("metric2").onclick = () =>
                 this._showMoreInfo(this.config.metric2_delta);
         }
         if (this.config.metric3_delta) {
-            newState.metric3Delta = hass.states[this.config.metric3_delta]?.state || "0.0";
+            newState.metric3Delta = states[this.config.metric3_delta]?.state || "0.0";
             hasChanges = hasChanges || this.lastStates.metric3Delta !== newState.metric3Delta;
             this.shadowRoot.getElementById("metric3").onclick = () =>
                 this._showMoreInfo(this.config.metric3_delta);
@@ -2,6 +2,17 @@ class TrendCard extends HTMLElement {
   constructor() {
     super();
     this.lastStates = {};
+    this._states = {}; // Latest states of the configured entities, pushed by the integration
+    this._series = {};
+    this._subscription = undefined; // Promise of the unsubscribe function, null if unavailable
+  }
+
+  connectedCallback() {
+    if (this._hass && this._subscription === undefined) this._subscribe();
+  }
+
+  disconnectedCallback() {
+    this._unsubscribe();
   }
 
   setConfig(config) {
@@ -10,6 +21,10 @@ class TrendCard extends HTMLElement {
     const trendLogo = 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAIwAAAAyCAYAAACOADM7AAAABGdBTUEAALGPC/xhBQAAAAZiS0dEAP8A/wD/oL2nkwAAAAlwSFlzAAALEwAACxMBAJqcGAAAAAd0SU1FB+gLBgkcFJcE7y0AAA4hSURBVHja7Zx7dBR1lsc/1dXvR5JOAgl5QyISXrogIPLQGdR1cAdFVh6u7uiuM64yK47sOp5VZ8fREccZGUd3kHGWAVd08LmgBxh0GQ/KYybyEAWNhDcJ5EVC0kl3+lW1f1R1pxO6OpWQltk99T3nnqqkf3Xr/ur3rfu7v3t/3WDAgAEDBgwYMGDAgAEDBgwYMGDg64DQj7ZOIBfwquJRxa2KSxWnenQkiC3haFePNsCiSgwhIM8YlgGjXR2TdIx/v7AOkL8GCQMNxrgPmCwDeeaD7mHWAQsAnFaR3AwrXrcVr8uCx2HB4zDjdphx2824bCIuuxmnTcRlM+OwijhsJhxWEZtFVI8m7BYTNotybhFNWMwCobBE3l0bASK9vI6BviGqz4321+bgcfT9+IS5bw/Iy5h1tBkJsG7pJBZML0pbjyNRKe1u8v8xPACiCTwOEZDSdiM9hMkAGDnMBbKcNkME2Rj1CyWMx25J6xjpJYwDIMMhgpw+5iZ01PAw/YcdVO+SzjHSSRgzgMNiSq+H6Y6/TMb4D5A1FvEvwsOIAGaTnFb2mgTNoHwYUKnKKFViWAIcNKiioLE9yMsfnmTC8Awqi9yYRdNFIYwJQBRSE0aSZKKSjMWsbWQwHMUXiBKKSBRk21Pd8xfAJGCcmvPRwq+Ar4DrgLJEc4DDwGZgJXAkTWP0PaAAGIqSo8oFsoEc9RjDYmCvepwFFCdOxkAtUAWsVW3ur5toBF5u80e+c+ev9wNgEQVCv7/hohAmwQOc3w/zwj8gSd2fyG9oG3nHC5/x5p/qAWj53Sy8bs3l3x3qICguxmujstBFZZGbUQUuRhW6WbL6Sw7WdsxSByAZxqjyA+A54BEg2KvNJcB84GrVc+XFPKqKZmA/sBF4FTjbiyzLehFDC79WY0Gt+KxclUXAH9VjYwp9U4C7gJlAaSyGUV+UViAnHB1QmmXwCIMsJfUwUSlJO03SdXfgrC+I1yVqNR36i9tHMqk8g3ElnqTEemhOGd9ZcYBL8p08MLuE68bnUDbEgSTD4Xo/mz9tZuUHpzjSEBCBpepDvgHoBEqA5cC8PnqdB1yvyjLgWeApoCtGlu/NKqLAa2NoppVcj4Vcj5Vst4Ucj4Vst4XFq75kzbbTToDxJW4W/3UJs8ZmU5xrR5ah9mwXVUfaWPvxGTbva0aGbwJb1RehN2ncwEsqobSQo2cs0k4YSZL0BVQp2tgt3dNVU1uQijyHtjeaMYyhmVZNnbdNy+PgKR9PLKjA2msaHFPkYkyRix/MLuG5TSd4ZN1hghF5OvAH1dNsALIALsl3Mn9qHldXehlV4CIvy4poEmhuD7H/RAcb9zXx6vZ6znaEncBjwM3AnNi9li2qIFvbU/L4rSN4Y1c9P5o3gofmlCEIPZ1MeZ6D8jwHi67K548HWlj0/Gc0tofHqqSZCnQkkGUTMANgSkUGd11TyMxRWZQOcWC3mGjtDHPgVAcbdjfx2611aQmA9RBGAgiFo/oYm6KN09qTMKnanmzyMzRD2zyzCX52W0XKe4oCLL2xhCnlGdzw9D46g9IV6vTiLsmxsfyOkcybMjRZJ8jLtHD9eC/Xj/eybGE5z248yVPrj9MVlsYBH8Vanmr2k+3SLt+U5NjYu2wylxa4lCkixSB+c0wWWx+dwNTHdtMRjI4FngQeAKwxsrhtIi99dxSLpuWfZ3OO28zVlVlcXZnFkhuK0uJh9ITRIQBfINw9LSWK1tSVRBwJhPmyroNQOBL/TIpGe6g50eRPqas/csVwF9muuBdwzxyVyf6nJzFvcq6u651WgcfmllL1xETKcu2oQWunQphAn9dfOsyh29axRU6enD88Zuu9wBDgUWCGVRTY9MPxLLpqaJ96SnNtqduk0cP4gGHjHqrCaROxq7UgiyggJXtbUrxBblucMKGH1x21PrzuKGaTgFkUCEekRI9mOtYYGDSX+sPfH+FUSxDAPqbQycZ/HYfbbu63/nHFLj760eVc9eN91LYEiwFONncNuuu/99oCfrr+BE2+sFWNs5YCPDq3lBmXZqY913KhHmYccCgUlTnnj1DfFuJ4cxc1DQGONHbF2lT0nMGSi6ubMP8Z81wRSaYrLBGV4xcvB9h+qI23qxpY9WFdSp19yfrdjbywpS6e1PndPSNx200D1lecY2X1PSPjvT3eFLgg+5KJ1Yzi/RRcAzi9LjNLZxcO4n3S52FCKmmc6vLNTs9qstQjz6HPw7hR9sOYe9kQBv4GGL5hz9l5G/Yoq9h/vCZ/QJ2rPu3nzpVfxReX147NYvIIT1Ibg2GJR988zms7m2jtjHD3N/J5/u/Lk+r9RmUmNrNAMCKzcusZVm+r55w/Qvi/Zgzam3xNZSYrt56JpQeYNylHiQHli1t007tKCsU8woUEvb0IA0pJPtKr2YaE83l6loe/2nKan71XS0dQ4rapuTyzqIyoBHOePUhbIApQDYyaPyVHU9fiNTWs2qasYouzrUwf6dFs++eadoIRGSDq64qKPp3L2P94/wxPbDhFJCpz18yhPLOwDJNGintMQTyxWQgwa3Smpv5gWOIfflvD+j0t/FWpi7fuH0V+lvWiEkY/UhJG6E0YLWxQRe5L5+t/auaBtcfif//mwwa2H2onwyFS09CFmsgqAriy3K2p69WdTdgtAku/VcAjcwpxWLULee9/3hrnDnAT0NSXne/ubeH+V47Gvd2zm09TkGXhwW8VJG1f6LX0eFbjix2a+p9+7xSv7WoGYEeNj/vWHOGdJZdetBimn4SRNSWJh7lgnc+/fybOHeCfgPaDdYH2XYc72lWy3IiyZZSyHKumnoVTcjn41GU8Oa+4u9CqIVs+PxfnjpoN7tPO5ZtPx8jybixOe2VHk/azssZfLgtAkdei2fatqngC+nGA9/a10NoRTmnP/zUPkzFYOj896Y+dPg/sBLb30r8rduKyautafffwPu8Vikis2NrIJ0djuTS26LVz74nO2OlyoA148FB9l+Y1ll5JcJdV0GybsPh4C7g/IuE9WNupTKt/8VNSivpFhiPuYTyDpTMQij/ET9XjQe22UZw2sd89ikoyaz5u5icbTnOyJR7KPQd8otfOjq64nXuBaLft8gU/g+6MBB3AGcAbCEUvci0pNQQ9b5mn28N4UIptMdSp9Zl+exirulpRdfq1uAI4jzR0Ma7Y0a+OvVHVwmPvnOZQQzBxAbAC+JfYwOuxM2HoOnr8T2cSra0zTLY7+XAVZlk4fjYEMBcYrfzPfNEyvcngAtYDH6NsL/Dpmcc93TFMNsr2g5h8m+6KKyj7XLbo0ZnljHuMt4HVwL8l89oAH33lSz2vJ8im/eeY8O9fsODFY4lkQU3T71DJkg9M1GNnAobE6kH9uEaZdjTazZ2YlTjdMbrAzugCu17dsbL2FekijAul1H8TMB1lk7hLAEpzLCnT0Rl2gSyHyBC3SEm2hfIhVuxmAeANlTQxssxGqRD3WW4o6l5NTAPuBH6ahDQfAazZ0awrPf/+5+d4emM9rZ1RMh0mrKLQe4PXm8DfAj8HduuxMwENPVIHOtP3O2s6NNs9PiePb1+Wgc0sMKHEwev3lPbdz/PxiR7SDGT/bCFQ67IKvPrdEnLcZoZ6zBR6LYmZXN2Yv/IEb+5uA2Vz0QqUTUR/t2RWLrPHe8h0iEwZ4dS8/mxHhOozQWoag9Q0hHhqU2Oyvl0RizfevreUWyZmDtgl3/riCd7a04Zq5+35GUrfvU6RD5aO0LxuzgvH+PNRP40+ZRabeYmLCaUOfrmwQPOaf36tjv/5ooPq+iDTKpxsf7giLUvlSU/UsPtEAJQtIFWDHcPYALKcIjddnqG7jqSFIe74lNJjFCeV2bl+tLtPvTkukWkVTqZVKKRKIEwidgPvALfct7aOyWUOirIH9tWnxvZwj79/fms+t1/p7dPOd79fBsDdL9eyansrG75fqkynKa55YVEB/723jVtePMnOw352He5garlr8OMSQf+MM5ApyQJgMwuDUtPI7F459XAjwcig10juA2obfBGu++VRaluCA9J//GxPwijfp9IvTjW/EoxEdbV324V4oHHv2jqC4QiDXbsymdJLGLOSJxB0B5CpxNmdoIp5uyCALxAdmE5tNKDs/a2trg8x8ckjrN/b1i/d/q4ota1xwkQAOoNSv3TE9np1dunrn717Dgjurw2y8KVaQmFpUJ59TBI8jJAOwiija2JQ9qok2TPuA2j1RwamMzWqY6Rp9EWZ+2It1y4/zgcHfbp0H6gLICmc9KPuh2ntjAyov76A3uviL0EVEFr/qY8Zzxzji7q+9+Gc6wzruofQX28xEEgydAQimMXzaSnJiSIjSco2hnAUQhGZYETGH5LwBSX2nzov/dIK0OSLpM5ryLLygqj3i6r6daBaXQr/Brh5a7WfrdV+irLM3DjOxfQKB5cV2RiRe34Qv0cJDAEOxOysbwv3K98R26XaFojous4X6FGbXQC8XnW8yzr+J8e4+XI38yd6uHKEncIsM7IMLZ1RqhtCbPy8k1U72vjwwWKKvWasZgFRANEkkLhLVJaVb3ykE5WqFxjMX23YBixMiDUuVF+7zr7MUutB5+kQQHZYBHmIW5TzPKKc5TDJohD/fIW6qpO/Rtmo2jxZzWan45czpqabNAE1Q5tM/GpWsx04B7Sg7IKvA46pb/reXmShn6SR1ARaRM3ABvpBlkQUAfcArwCfqXZr3XMF3V9FWXwBL8hAyBKDiLL143XgBN3bRCJ0/2TKNrUvrer02aV+FkkiuslifI9Z+7nYUarqifNSUH1RosYjMmDAgAEDBgwYMGDAgAEDBgwYMJBO/C85xwnkO3LKIwAAAABJRU5ErkJggg==';
 
     const theme = config.theme || {};
+    const sparkline = (metricId) => config.sparkline ? `
+                        <svg class="sparkline" viewBox="0 0 100 20" preserveAspectRatio="none">
+                            <polyline id="${metricId}-sparkline" fill="none" stroke="currentColor" stroke-width="2" points=""/>
+                        </svg>` : "";
     const bgColor = theme.bgColor || "#2c2c2e";
     const textColor = theme.text_color || "#ffffff";
     const iconColor = theme.iconColor || "#ff9e32";
@@ -255,6 +270,14 @@ class TrendCard extends HTMLElement {
                     opacity: 0.1;
                 }
 
+                .sparkline {
+                    width: 60px;
+                    height: 24px;
+                    margin-left: 5px;
+                    color: ${theme.textColor};
+                    opacity: 0.6;
+                }
+
             </style>
 
             <div class="main-container">
@@ -301,6 +324,7 @@ class TrendCard extends HTMLElement {
                             <svg class="indicator-equal" id="metric1-equal" width="24" height="24" viewBox="0 0 24 24"><path fill="#4ff24b" d="M5 11h14v2H5z"/></svg>
                             <svg class="indicator-up indicator-dimmed" id="metric1-up" width="24" height="24" viewBox="0 0 24 24"><path fill="#ff4c4c" d="M12 8l6 6H6z"/></svg>
                         </div>
+                        ${sparkline("metric1")}
                     </div>
 
                     <div class="trend-card" id="metric2-card">
@@ -313,6 +337,7 @@ class TrendCard extends HTMLElement {
                             <svg class="indicator-equal" id="metric2-equal" width="24" height="24" viewBox="0 0 24 24"><path fill="#4ff24b" d="M5 11h14v2H5z"/></svg>
                             <svg class="indicator-up indicator-dimmed" id="metric2-up" width="24" height="24" viewBox="0 0 24 24"><path fill="#ff4c4c" d="M12 8l6 6H6z"/></svg>
                         </div>
+                        ${sparkline("metric2")}
                     </div>
 
                     <div class="trend-card" id="metric3-card">
@@ -325,22 +350,115 @@ class TrendCard extends HTMLElement {
                             <svg class="indicator-equal" id="metric3-equal" width="24" height="24" viewBox="0 0 24 24"><path fill="#4ff24b" d="M5 11h14v2H5z"/></svg>
                             <svg class="indicator-up indicator-dimmed" id="metric3-up" width="24" height="24" viewBox="0 0 24 24"><path fill="#ff4c4c" d="M12 8l6 6H6z"/></svg>
                         </div>
+                        ${sparkline("metric3")}
                     </div>
                 </div>
             </div>
         `;
+
+    // Resubscribe for the entities of the new config
+    if (this._subscription !== undefined) {
+      this._unsubscribe();
+      this._subscribe();
+    }
   }
 
   set hass(hass) {
+    this._hass = hass;
+    if (this._subscription === undefined) {
+      this._subscribe();
+    }
+    if (this._subscription === null) {
+      this._update(hass.states);
+    }
+    // While subscribed, updates of other entities in HA do not re-render the card
+  }
+
+  _entityIds() {
+    const config = this.config;
+    return [
+      config.interval,
+      config.steps,
+      config.current_step,
+      config.metric1_delta,
+      config.metric2_delta,
+      config.metric3_delta,
+    ].filter(Boolean);
+  }
+
+  _subscribe() {
+    const entityIds = this._entityIds();
+    if (!this._hass || !this.isConnected || entityIds.length === 0) return;
+
+    this._subscription = this._hass.connection
+      .subscribeMessage((message) => this._handleMessage(message), {
+        type: "better_trends/subscribe",
+        entity_ids: entityIds,
+        points: this.config.sparkline ? this.config.sparkline_points || 60 : 0,
+        hours: this.config.sparkline_hours || 24,
+      })
+      .catch((error) => {
+        // Integration without the websocket API, read hass.states on every update instead
+        console.warn("BetterTrends: live updates unavailable, using hass.states.", error);
+        this._subscription = null;
+        if (this._hass) this._update(this._hass.states);
+      });
+  }
+
+  _unsubscribe() {
+    if (this._subscription) {
+      this._subscription.then((unsubscribe) => unsubscribe && unsubscribe());
+    }
+    this._subscription = undefined;
+  }
+
+  _handleMessage(message) {
+    if (message.series) {
+      this._series = { ...this._series, ...message.series };
+    }
+    const changes = message.states || message.updates || {};
+    const maxPoints = this.config.sparkline_points || 60;
+    for (const [entityId, state] of Object.entries(changes)) {
+      this._states[entityId] = state;
+      const series = this._series[entityId];
+      if (message.updates && state && series && !isNaN(parseFloat(state.state))) {
+        series.push([state.last_updated, parseFloat(state.state)]);
+        if (series.length > maxPoints) series.splice(0, series.length - maxPoints);
+      }
+    }
+    this._update(this._states);
+    if (this.config.sparkline) this._renderSparklines();
+  }
+
+  _renderSparklines() {
+    const config = this.config;
+    const metrics = { metric1: config.metric1_delta, metric2: config.metric2_delta, metric3: config.metric3_delta };
+    for (const [metricId, entityId] of Object.entries(metrics)) {
+      const line = this.shadowRoot.getElementById(`${metricId}-sparkline`);
+      if (!line) continue;
+      const values = (this._series[entityId] || []).map((point) => point[1]);
+      if (values.length < 2) {
+        line.setAttribute("points", "");
+        continue;
+      }
+      const min = Math.min(...values);
+      const range = Math.max(...values) - min || 1;
+      line.setAttribute("points", values
+        .map((value, index) => `${(index / (values.length - 1)) * 100},${20 - ((value - min) / range) * 20}`)
+        .join(" "));
+    }
+  }
+
+  _update(states) {
     const config = this.config;
 
     const newState = {
-      interval: Math.round(hass.states[config.interval]?.state || 0),
-      steps: Math.round(hass.states[config.steps]?.state || 0),
-      currentStep: hass.states[config.current_step]?.state || 0,
-      metric1Delta: hass.states[config.metric1_delta]?.state || "0.0",
-      metric2Delta: hass.states[config.metric2_delta]?.state || "0.0",
-      metric3Delta: hass.states[config.metric3_delta]?.state || "0.0",
+      interval: Math.round(states[config.interval]?.state || 0),
+      steps: Math.round(states[config.steps]?.state || 0),
+      currentStep: states[config.current_step]?.state || 0,
+      metric1Delta: states[config.metric1_delta]?.state || "0.0",
+      metric2Delta: states[config.metric2_delta]?.state || "0.0",
+      metric3Delta: states[config.metric3_delta]?.state || "0.0",
     };
 
     if (JSON.stringify(newState) === JSON.stringify(this.lastStates)) return;
@@ -1,8 +1,8 @@
-from homeassistant.components.number import NumberEntity, NumberMode
+from homeassistant.components.number import NumberMode, RestoreNumber
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from .const import DOMAIN, DEFAULT_INTERVAL, DEFAULT_TREND_VALUES, TREND_INTERVAL_ENTITY, TREND_VALUES_ENTITY, \
-    TREND_COUNTER_ENTITY
+from .const import DEFAULT_INTERVAL, DEFAULT_TREND_VALUES, DATA_NUMBERS_READY
+from .coordinator import GroupIds
 import logging
 
 _LOGGER = logging.getLogger(__name__)
@@ -10,39 +10,49 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up BetterTrends numbers from a config entry."""
+    ids = GroupIds(entry)
+    ready_events = hass.data.get(DATA_NUMBERS_READY, {}).get(entry.entry_id, {})
     try:
         # Create numeric entities for interval, steps, and current step
         interval_entity = TrendNumber(
-            "BetterTrends Interval",
-            TREND_INTERVAL_ENTITY,
+            f"{ids.label} Interval",
+            ids.interval,
             DEFAULT_INTERVAL,
             5,
             9999,
+            restore=True,
         )
         steps_entity = TrendNumber(
-            "BetterTrends Steps",
-            TREND_VALUES_ENTITY,
+            f"{ids.label} Steps",
+            ids.steps,
             DEFAULT_TREND_VALUES,
             1,
             1000,
+            restore=True,
         )
         current_step_entity = TrendNumber(
-            "BetterTrends Current Step",
-            TREND_COUNTER_ENTITY,
+            f"{ids.label} Current Step",
+            ids.counter,
             0,  # Initial value should be 0 for the current step
             0,
             1000,
         )
+        for number in (interval_entity, steps_entity, current_step_entity):
+            number.ready = ready_events.get(number.unique_id)
 
         async_add_entities([interval_entity, steps_entity, current_step_entity], update_before_add=True)
     except Exception as e:
         _LOGGER.error(f"Error setting up entities: {e}")
+        # Do not keep the manager waiting, it starts with the default settings
+        for ready in ready_events.values():
+            ready.set()
 
 
-class TrendNumber(NumberEntity):
+class TrendNumber(RestoreNumber):
     """A numeric entity representing a configurable value."""
 
-    def __init__(self, name, unique_id, initial_value, min_value, max_value):
+    def __init__(self, name, unique_id, initial_value, min_value, max_value, restore=False):
+        self._restore = restore  # Keep user settings across restarts
         self._attr_name = name
         self._attr_unique_id = unique_id
         self._attr_native_value = initial_value
@@ -50,11 +60,20 @@ class TrendNumber(NumberEntity):
         self._attr_max_value = max_value
         self._attr_step = 1  # Step size for adjustments
         self._attr_mode = NumberMode.BOX  # Editable field in the UI
+        self.ready = None  # Event the manager of the entry waits for
 
     async def async_added_to_hass(self):
         """Set initial state when added to hass."""
+        if self._restore:
+            last_data = await self.async_get_last_number_data()
+            if last_data and last_data.native_value is not None:
+                self._attr_native_value = int(last_data.native_value)
         self.async_write_ha_state()
 
+        # Tell the manager that this setting can be read
+        if self.ready:
+            self.ready.set()
+
     @property
     def unique_id(self):
         """Return a truly unique ID for the number entity."""
@@ -0,0 +1,48 @@
+"""Deadband and rate limiting for trend state writes."""
+
+
+class TrendPublisher:
+    """Decide whether a newly calculated trend value is worth a state write.
+
+    A value is written if it moved by more than the absolute deadband and by more
+    than the relative deadband (fraction of the last written value), and at least
+    ``min_interval`` seconds passed since the last write. Once ``heartbeat`` seconds
+    passed, the next value is written regardless.
+    """
+
+    __slots__ = ("_deadband_abs", "_deadband_rel", "_min_interval", "_heartbeat", "_last")
+
+    def __init__(self, deadband_abs=0.0, deadband_rel=0.0, min_interval=0.0, heartbeat=0.0):
+        self._deadband_abs = deadband_abs
+        self._deadband_rel = deadband_rel
+        self._min_interval = min_interval
+        self._heartbeat = heartbeat
+        self._last = {}  # Key -> (last written value, monotonic time of the write)
+
+    def check(self, key, value: float, now: float):
+        """Return (publish, heartbeat) for a new value of ``key`` at monotonic time ``now``."""
+        last = self._last.get(key)
+        if last is None:
+            return True, False
+
+        last_value, last_time = last
+        elapsed = now - last_time
+        if self._heartbeat and elapsed >= self._heartbeat:
+            return True, True
+        if elapsed < self._min_interval:
+            return False, False
+
+        change = abs(value - last_value)
+        if change <= self._deadband_abs:
+            return False, False
+        if self._deadband_rel and change <= self._deadband_rel * abs(last_value):
+            return False, False
+        return True, False
+
+    def record(self, key, value: float, now: float):
+        """Remember that ``value`` was written for ``key`` at ``now``."""
+        self._last[key] = (value, now)
+
+    def forget(self, key):
+        """Drop the history of ``key``."""
+        self._last.pop(key, None)
@@ -0,0 +1,32 @@
+"""Per-entity state kept by the BetterTrends manager."""
+import sys
+
+
+def trend_sensor_id(entity_id: str) -> str:
+    """Return the entity id of the trend sensor for a tracked entity.
+
+    The id is interned, so the manager record and the sensor entity share one string.
+    """
+    return sys.intern(f"sensor.bettertrends_{entity_id.replace('.', '_')}")
+
+
+class TrackedEntity:
+    """Compact record of one tracked entity.
+
+    Slots instead of an instance dict, the trend sensor id built once instead of on
+    every tick, and the samples in the record's array-backed buffer.
+    """
+
+    __slots__ = ("entity_id", "sensor_entity_id", "buffer", "algorithm", "last_trend", "rollups", "updated")
+
+    def __init__(self, entity_id: str):
+        self.entity_id = entity_id
+        self.sensor_entity_id = trend_sensor_id(entity_id)
+        self.buffer = None  # TrendBuffer or TimeWindowBuffer, created once the window size is known
+        self.algorithm = None  # TrendAlgorithm, only for entities with a non-default algorithm
+        self.last_trend = None  # Last trend value written to the trend sensor
+        self.rollups = None  # TrendRollups, only if trends are published as long-term statistics
+        self.updated = None  # Time the last time-weighted sample was reported at, in seconds since the epoch
+
+    def __repr__(self):
+        return f"TrackedEntity({self.entity_id!r}, buffer={self.buffer!r})"
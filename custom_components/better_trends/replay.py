@@ -0,0 +1,268 @@
+"""Replay recorder history through the trend engine, to try settings before using them.
+
+States are streamed out of the recorder's SQLite database one time chunk at a time,
+sampled on the polling schedule and run through the same buffers, algorithms and
+publisher the manager uses. Only the current state and the trend window of every
+entity are kept in memory, and the published trends are yielded as they come, so
+the length of the history does not matter.
+
+Usable without a running Home Assistant instance:
+
+    python -m custom_components.better_trends.replay home-assistant_v2.db sensor.outdoor_temperature \\
+        --start 2024-01-01 --end 2024-02-01 --interval 60 --steps 15 --output trends.csv
+"""
+import argparse
+import csv
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import sqlite3
+import sys
+
+from .algorithms import ALGORITHMS, mean_delta
+from .buffer import TimeWindowBuffer, TrendBuffer
+from .const import ALGORITHM_MEAN_DELTA, DEFAULT_INTERVAL, DEFAULT_TREND_VALUES
+from .publisher import TrendPublisher
+from .record import TrackedEntity
+
+CHUNK_SECONDS = 3600  # Time span of one query
+FETCH_ROWS = 5000  # Rows fetched from the cursor at once
+CSV_HEADER = ("timestamp", "entity_id", "value", "trend")
+
+
+def open_database(path) -> sqlite3.Connection:
+    """Open a recorder database read-only, next to a running recorder."""
+    return sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def _to_float(state):
+    try:
+        return float(state)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_states(connection: sqlite3.Connection, entity_ids, start: float, end: float,
+                chunk_seconds: float = CHUNK_SECONDS):
+    """Yield (timestamp, entity_id, value) of the recorded states, oldest first.
+
+    The state each entity had at ``start`` comes first, then every change until ``end``.
+    The changes are queried ``chunk_seconds`` at a time and fetched FETCH_ROWS rows at a
+    time. The value is None for non-numeric states.
+    """
+    entity_ids = list(entity_ids)
+    metadata = dict(connection.execute(
+        f"SELECT metadata_id, entity_id FROM states_meta WHERE entity_id IN ({','.join('?' * len(entity_ids))})",
+        entity_ids,
+    ))
+    if not metadata:
+        return
+
+    for metadata_id, entity_id in metadata.items():
+        row = connection.execute(
+            "SELECT last_updated_ts, state FROM states WHERE metadata_id = ? AND last_updated_ts < ? "
+            "ORDER BY last_updated_ts DESC LIMIT 1",
+            (metadata_id, start),
+        ).fetchone()
+        if row:
+            yield row[0], entity_id, _to_float(row[1])
+
+    ids = list(metadata)
+    query = (
+        f"SELECT last_updated_ts, metadata_id, state FROM states WHERE metadata_id IN ({','.join('?' * len(ids))}) "
+        "AND last_updated_ts >= ? AND last_updated_ts < ? ORDER BY last_updated_ts, state_id"
+    )
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + chunk_seconds, end)
+        cursor = connection.execute(query, (*ids, chunk_start, chunk_end))
+        while rows := cursor.fetchmany(FETCH_ROWS):
+            for timestamp, metadata_id, state in rows:
+                yield timestamp, metadata[metadata_id], _to_float(state)
+        chunk_start = chunk_end
+
+
+class TrendReplay:
+    """The polling trend engine, driven by recorded states instead of the clock.
+
+    Mirrors the manager on the global schedule: every ``interval`` seconds each entity
+    is sampled with the value it had at that time, a window is complete after ``steps``
+    ticks (tumbling) or on every tick once full (rolling), and the trends pass through
+    the deadband and rate limits of ``publisher`` before they count as reported.
+    """
+
+    def __init__(self, entity_ids, interval: float = DEFAULT_INTERVAL, steps: int = DEFAULT_TREND_VALUES,
+                 rolling: bool = False, algorithms: dict = None, time_weighted: bool = False,
+                 publisher: TrendPublisher = None):
+        self._interval = interval
+        self._steps = steps
+        self._rolling = rolling
+        self._algorithms = {} if time_weighted else (algorithms or {})
+        self._time_weighted = time_weighted
+        self._publisher = publisher or TrendPublisher()
+        self._counter = 0
+        self._values = {}  # Entity id -> value at the current time, None if not numeric
+        self._updated = {}  # Entity id -> time the current value was recorded at
+        self._records = {entity_id: TrackedEntity(entity_id) for entity_id in entity_ids}
+        for record in self._records.values():
+            self._reset(record)
+
+    def _reset(self, record: TrackedEntity):
+        if self._time_weighted:
+            record.buffer = TimeWindowBuffer(self._interval * self._steps)
+            return
+        name = self._algorithms.get(record.entity_id)
+        record.algorithm = ALGORITHMS[name](self._steps + 1, self._interval) if name in ALGORITHMS else None
+        record.buffer = TrendBuffer(self._steps + 1)
+
+    def _trend(self, record: TrackedEntity, now: float):
+        """Return the trend value of a record, calculated like the manager does."""
+        buffer = record.buffer
+        if record.algorithm:
+            return record.algorithm.value()
+        if self._time_weighted:
+            return mean_delta(buffer.last(), buffer.mean(now))
+        return mean_delta(buffer.last(), buffer.mean())
+
+    def tick(self, now: float) -> list:
+        """Sample every entity at ``now`` and return the (timestamp, entity_id, value, trend) rows reported."""
+        window_complete = self._counter >= self._steps
+        due = []
+        for entity_id, record in self._records.items():
+            value = self._values.get(entity_id)
+            if value is None:
+                continue  # Unknown or not numeric, skipped like on a live tick
+            if self._time_weighted:
+                # Stamped with the time it was recorded at and sampled once, like the manager does
+                updated = self._updated.get(entity_id, now)
+                if updated != record.updated:
+                    record.updated = updated
+                    record.buffer.append(updated, value)
+                full = record.buffer.covers(now)
+            else:
+                evicted = record.buffer.append(value)
+                if record.algorithm:
+                    record.algorithm.update(value, evicted)
+                full = record.buffer.full
+            if (self._rolling and full) or (not self._rolling and window_complete):
+                due.append((record, value))
+
+        rows = []
+        for record, value in due:
+            trend = self._trend(record, now)
+            if trend is not None:
+                publish, _ = self._publisher.check(record.entity_id, trend, now)
+                if publish:
+                    self._publisher.record(record.entity_id, trend, now)
+                    record.last_trend = trend
+                    rows.append((now, record.entity_id, value, trend))
+            if not self._rolling:
+                if self._time_weighted:
+                    record.buffer.clear(now)
+                else:
+                    record.buffer.clear()
+                    if record.algorithm:
+                        record.algorithm.reset()
+
+        self._counter = (self._counter + 1) % (self._steps + 1)
+        return rows
+
+    def run(self, states, start: float, end: float):
+        """Feed time-ordered (timestamp, entity_id, value) states and yield the reported rows of every tick.
+
+        A tick samples the states recorded up to and including its own time.
+        """
+        index = 0
+        tick = start
+        for timestamp, entity_id, value in states:
+            while tick < timestamp and tick < end:
+                yield from self.tick(tick)
+                index += 1
+                tick = start + index * self._interval
+            if entity_id in self._records:
+                self._values[entity_id] = value
+                self._updated[entity_id] = timestamp
+        while tick < end:
+            yield from self.tick(tick)
+            index += 1
+            tick = start + index * self._interval
+
+
+def replay_database(database, entity_ids, start: datetime, end: datetime, chunk_seconds: float = CHUNK_SECONDS,
+                    **settings):
+    """Yield the rows the trend sensors would have reported between start and end.
+
+    ``settings`` are passed on to TrendReplay.
+    """
+    start_ts, end_ts = start.timestamp(), end.timestamp()
+    connection = open_database(database)
+    try:
+        replay = TrendReplay(entity_ids, **settings)
+        yield from replay.run(iter_states(connection, entity_ids, start_ts, end_ts, chunk_seconds), start_ts, end_ts)
+    finally:
+        connection.close()
+
+
+def write_csv(rows, file) -> int:
+    """Write rows to an open text file as CSV and return how many there were."""
+    writer = csv.writer(file)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for timestamp, entity_id, value, trend in rows:
+        writer.writerow((datetime.fromtimestamp(timestamp, timezone.utc).isoformat(), entity_id, value, trend))
+        count += 1
+    return count
+
+
+def replay_to_csv(path, database, entity_ids, start: datetime, end: datetime, **settings) -> int:
+    """Replay the history into a CSV file and return the number of rows written."""
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        return write_csv(replay_database(database, entity_ids, start, end, **settings), file)
+
+
+def _parse_time(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("database", help="Recorder SQLite database, usually home-assistant_v2.db")
+    parser.add_argument("entity_ids", nargs="+", help="Entities to replay")
+    parser.add_argument("--start", type=_parse_time, help="ISO start time, UTC without a time zone (default: a day ago)")
+    parser.add_argument("--end", type=_parse_time, help="ISO end time, UTC without a time zone (default: now)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between two samples")
+    parser.add_argument("--steps", type=int, default=DEFAULT_TREND_VALUES, help="Samples per trend window")
+    parser.add_argument("--rolling", action="store_true", help="Rolling instead of tumbling windows")
+    parser.add_argument("--algorithm", choices=(ALGORITHM_MEAN_DELTA, *ALGORITHMS), default=ALGORITHM_MEAN_DELTA)
+    parser.add_argument("--time-weighted", action="store_true", help="Time-weighted trends")
+    parser.add_argument("--deadband-abs", type=float, default=0.0)
+    parser.add_argument("--deadband-rel", type=float, default=0.0, help="Relative deadband in percent")
+    parser.add_argument("--min-publish-interval", type=float, default=0.0)
+    parser.add_argument("--heartbeat", type=float, default=0.0)
+    parser.add_argument("--chunk-hours", type=float, default=CHUNK_SECONDS / 3600, help="Hours of history per query")
+    parser.add_argument("--output", help="CSV file to write (default: standard output)")
+    args = parser.parse_args(argv)
+
+    end = args.end or datetime.now(timezone.utc)
+    start = args.start or end - timedelta(days=1)
+    rows = replay_database(
+        args.database, args.entity_ids, start, end,
+        chunk_seconds=args.chunk_hours * 3600,
+        interval=args.interval,
+        steps=args.steps,
+        rolling=args.rolling,
+        algorithms={entity_id: args.algorithm for entity_id in args.entity_ids},
+        time_weighted=args.time_weighted,
+        publisher=TrendPublisher(args.deadband_abs, args.deadband_rel / 100, args.min_publish_interval,
+                                 args.heartbeat),
+    )
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as file:
+            count = write_csv(rows, file)
+        print(f"Wrote {count} trend values to {args.output}", file=sys.stderr)
+    else:
+        write_csv(rows, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Serve the Lovelace cards from memory, precompressed and with cache validators."""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import gzip
+import hashlib
+import logging
+from pathlib import Path
+
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+_LOGGER = logging.getLogger(__name__)
+
+RESOURCE_URL = "/hacsfiles/better_trends/lovelace"
+CONTENT_TYPES = {".js": "application/javascript", ".json": "application/json", ".css": "text/css"}
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+class Resource:
+    """One file of the lovelace folder, with its compressed variants and validators."""
+
+    __slots__ = ("body", "gzip", "brotli", "etag", "last_modified", "version", "content_type")
+
+    def __init__(self, body: bytes, modified: float, content_type: str):
+        self.body = body
+        self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+        self.brotli = brotli.compress(body) if brotli else None
+        self.version = hashlib.sha256(body).hexdigest()[:12]
+        self.etag = f'"{self.version}"'
+        # HTTP dates have a resolution of one second
+        self.last_modified = datetime.fromtimestamp(int(modified), timezone.utc)
+        self.content_type = content_type
+
+
+def build_resource_index(folder: Path) -> dict:
+    """Read and compress every file in ``folder``. Runs in the executor."""
+    index = {}
+    for path in sorted(folder.iterdir()):
+        if path.is_file() and not path.name.startswith("."):
+            content_type = CONTENT_TYPES.get(path.suffix, "application/octet-stream")
+            index[path.name] = Resource(path.read_bytes(), path.stat().st_mtime, content_type)
+    _LOGGER.debug("Indexed %d BetterTrends resources: %s", len(index), ", ".join(index))
+    return index
+
+
+def resource_url(index: dict, filename: str) -> str:
+    """Return the versioned URL of a resource, cached by browsers until its content changes."""
+    resource = index.get(filename)
+    if resource is None:
+        return f"{RESOURCE_URL}/{filename}"
+    return f"{RESOURCE_URL}/{filename}?v={resource.version}"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Return True if an If-None-Match header matches the ETag (weak comparison)."""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _accepted_encodings(header: str) -> set:
+    """Return the content codings an Accept-Encoding header allows."""
+    encodings = set()
+    for part in header.lower().split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue  # Explicitly refused
+            except ValueError:
+                continue
+        encodings.add(coding.strip())
+    return encodings
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+class BetterTrendsResourceView(HomeAssistantView):
+    """Serve custom Lovelace resources for BetterTrends."""
+
+    url = RESOURCE_URL + "/{filename}"
+    name = "hacsfiles:better_trends"
+    requires_auth = False
+
+    def __init__(self, index: dict):
+        self._index = index
+
+    async def get(self, request, filename):
+        """Serve the requested file from the in-memory index."""
+        if "/" in filename or "\\" in filename or filename.startswith("."):
+            return web.Response(status=400, text="Invalid resource name.")
+        resource = self._index.get(filename)
+        if resource is None:
+            return web.Response(status=404, text="Resource not found.")
+
+        # A URL with the current version never changes, anything else must be revalidated
+        versioned = request.query.get("v") == resource.version
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE if versioned else REVALIDATE_CACHE,
+            "ETag": resource.etag,
+            "Last-Modified": format_datetime(resource.last_modified, usegmt=True),
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            if _etag_matches(if_none_match, resource.etag):
+                return web.Response(status=304, headers=headers)
+        elif (if_modified_since := request.headers.get("If-Modified-Since")) is not None:
+            if _not_modified_since(if_modified_since, resource.last_modified):
+                return web.Response(status=304, headers=headers)
+
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        if resource.brotli is not None and "br" in accepted:
+            body = resource.brotli
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = resource.gzip
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = resource.body
+
+        return web.Response(body=body, content_type=resource.content_type, headers=headers)
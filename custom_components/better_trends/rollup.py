@@ -0,0 +1,106 @@
+"""Fixed-size min/mean/max rollups of trend values, for long-term statistics."""
+from array import array
+
+# Resolution -> (bucket length in seconds, buckets kept)
+RESOLUTIONS = {
+    "5minute": (300, 144),  # 12 hours
+    "hour": (3600, 48),  # 2 days, published as long-term statistics
+    "day": (86400, 31),  # A month, days in UTC
+}
+
+
+class RollupRing:
+    """Min, mean and max of a value per time bucket, for the newest ``capacity`` buckets.
+
+    The buckets are contiguous in time, so only the start of the newest one is stored
+    and the others follow from their position. Adding a value is O(1) amortized and
+    the memory used never grows. Buckets without values have a count of 0.
+    """
+
+    __slots__ = ("resolution", "capacity", "_min", "_max", "_sum", "_count", "_head", "_newest")
+
+    def __init__(self, resolution: int, capacity: int):
+        self.resolution = resolution
+        self.capacity = capacity
+        self._min = array("d", bytes(8 * capacity))
+        self._max = array("d", bytes(8 * capacity))
+        self._sum = array("d", bytes(8 * capacity))
+        self._count = array("I", bytes(4 * capacity))
+        self._head = 0  # Index of the newest bucket
+        self._newest = None  # Start of the newest bucket, in seconds since the epoch
+
+    def add(self, timestamp: float, value: float):
+        """Add a value to the bucket containing ``timestamp``."""
+        start = timestamp - timestamp % self.resolution
+        if self._newest is None:
+            self._newest = start
+        elif start > self._newest:
+            # Start the new bucket, emptying the ones skipped without values
+            for _ in range(min(int((start - self._newest) // self.resolution), self.capacity)):
+                self._head = (self._head + 1) % self.capacity
+                self._count[self._head] = 0
+            self._newest = start
+
+        offset = int((self._newest - start) // self.resolution)
+        if offset >= self.capacity:
+            return  # Older than the oldest bucket kept
+        index = (self._head - offset) % self.capacity
+        if self._count[index]:
+            self._min[index] = min(self._min[index], value)
+            self._max[index] = max(self._max[index], value)
+            self._sum[index] += value
+        else:
+            self._min[index] = self._max[index] = self._sum[index] = value
+        self._count[index] += 1
+
+    def buckets(self, since: float = None, until: float = None):
+        """Yield (start, min, mean, max) of the buckets with values, oldest first.
+
+        Only buckets starting at or after ``since`` and ending at or before ``until`` are included.
+        """
+        if self._newest is None:
+            return
+        for offset in range(self.capacity - 1, -1, -1):
+            index = (self._head - offset) % self.capacity
+            count = self._count[index]
+            start = self._newest - offset * self.resolution
+            if not count or (since is not None and start < since):
+                continue
+            if until is not None and start + self.resolution > until:
+                break
+            yield start, self._min[index], self._sum[index] / count, self._max[index]
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the buckets, in bytes."""
+        return sum(column.itemsize * len(column) for column in (self._min, self._max, self._sum, self._count))
+
+    def __repr__(self):
+        return f"RollupRing(resolution={self.resolution}, buckets={len(list(self.buckets()))}/{self.capacity})"
+
+
+class TrendRollups:
+    """The rollups of one trend at every resolution, and how far they were published."""
+
+    __slots__ = ("rings", "published")
+
+    def __init__(self):
+        self.rings = {name: RollupRing(resolution, capacity) for name, (resolution, capacity) in RESOLUTIONS.items()}
+        self.published = None  # End of the last hour published as a statistic
+
+    def add(self, timestamp: float, value: float):
+        """Add a trend value calculated at ``timestamp``."""
+        for ring in self.rings.values():
+            ring.add(timestamp, value)
+
+    def closed_hours(self, now: float) -> list:
+        """Return the (start, min, mean, max) hours completed before ``now`` and not published yet."""
+        hours = list(self.rings["hour"].buckets(self.published, now))
+        if hours:
+            self.published = hours[-1][0] + self.rings["hour"].resolution
+        return hours
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by all resolutions, in bytes."""
+        return sum(ring.nbytes for ring in self.rings.values())
@@ -0,0 +1,59 @@
+"""Schedule groups and the timer queue that drives the BetterTrends main loop."""
+from heapq import heapify, heappop, heappush
+from itertools import count
+
+
+class TrendGroup:
+    """Entities that share an interval and window of their own instead of the global settings."""
+
+    __slots__ = ("interval", "trend_values", "counter", "entities")
+
+    def __init__(self, interval: int, trend_values: int):
+        self.interval = interval
+        self.trend_values = trend_values
+        self.counter = 0
+        self.entities = set()
+
+    @property
+    def key(self) -> str:
+        """Return the key identifying the schedule of this group."""
+        return f"{self.interval}:{self.trend_values}"
+
+    def __repr__(self):
+        return f"TrendGroup(interval={self.interval}, trend_values={self.trend_values}, entities={len(self.entities)})"
+
+
+class TrendScheduler:
+    """Single timer queue ordered by the next due time of every schedule.
+
+    Items are popped in due-time order, so the main loop only ever waits for the
+    schedule that is due next instead of running one loop per group.
+    """
+
+    def __init__(self):
+        self._queue = []
+        self._sequence = count()  # Tie breaker, keeps items with the same due time in FIFO order
+
+    def schedule(self, due: float, item):
+        """Queue ``item`` to be due at the loop time ``due``."""
+        heappush(self._queue, (due, next(self._sequence), item))
+
+    def pop(self):
+        """Remove and return the (due, item) pair that is due next."""
+        due, _, item = heappop(self._queue)
+        return due, item
+
+    def reschedule(self, match, new_due):
+        """Move every queued item for which ``match(item)`` is true to ``new_due(due)``."""
+        self._queue = [
+            (new_due(due), sequence, item) if match(item) else (due, sequence, item)
+            for due, sequence, item in self._queue
+        ]
+        heapify(self._queue)
+
+    def clear(self):
+        """Drop all queued items."""
+        self._queue.clear()
+
+    def __len__(self):
+        return len(self._queue)
@@ -0,0 +1,65 @@
+"""Index of the sensors BetterTrends can track, for selecting many of them at once."""
+from fnmatch import fnmatchcase
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+
+class SensorIndex:
+    """Sensor entity ids by device class, area and label, built once per flow.
+
+    Validating an entity is a set lookup and every bulk selection is resolved with
+    set operations, instead of scanning all states for each entity added.
+    """
+
+    __slots__ = ("entity_ids", "ordered", "device_classes", "areas", "labels")
+
+    def __init__(self, hass: HomeAssistant):
+        self.entity_ids = set()
+        self.device_classes = {}  # Device class -> entity ids
+        self.areas = {}  # Area id -> entity ids, the area of the entity or else of its device
+        self.labels = {}  # Label id -> entity ids
+
+        entity_registry = er.async_get(hass)
+        device_registry = dr.async_get(hass)
+        for state in hass.states.async_all("sensor"):
+            entity_id = state.entity_id
+            self.entity_ids.add(entity_id)
+            device_class = state.attributes.get("device_class")
+            if device_class:
+                self.device_classes.setdefault(device_class, set()).add(entity_id)
+
+            entry = entity_registry.async_get(entity_id)
+            if entry is None:
+                continue
+            area_id = entry.area_id
+            if area_id is None and entry.device_id:
+                device = device_registry.async_get(entry.device_id)
+                area_id = device.area_id if device else None
+            if area_id:
+                self.areas.setdefault(area_id, set()).add(entity_id)
+            for label in entry.labels:
+                self.labels.setdefault(label, set()).add(entity_id)
+        self.ordered = sorted(self.entity_ids)
+
+    def __contains__(self, entity_id):
+        return entity_id in self.entity_ids
+
+    def select(self, pattern: str = None, device_class: str = None, areas=(), labels=()) -> set:
+        """Return the sensors matching every given criterion.
+
+        ``pattern`` is a glob over entity ids such as ``sensor.*_power``. Several areas
+        or labels match sensors in any of them. Without criteria nothing is selected.
+        """
+        criteria = []
+        if pattern:
+            criteria.append({entity_id for entity_id in self.ordered if fnmatchcase(entity_id, pattern)})
+        if device_class:
+            criteria.append(self.device_classes.get(device_class, set()))
+        if areas:
+            criteria.append(set().union(*(self.areas.get(area_id, ()) for area_id in areas)))
+        if labels:
+            criteria.append(set().union(*(self.labels.get(label, ()) for label in labels)))
+        if not criteria:
+            return set()
+        return set.intersection(*criteria)
@@ -1,25 +1,50 @@
 import asyncio
+from datetime import timedelta
 import logging
+import time
 from homeassistant.components.sensor import SensorEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_change, \
+    async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, DEFAULT_INTERVAL, DEFAULT_TREND_VALUES, TREND_INTERVAL_ENTITY, TREND_VALUES_ENTITY, \
-    TREND_COUNTER_ENTITY
+from .const import DOMAIN, DEFAULT_INTERVAL, DEFAULT_TREND_VALUES, CONF_UPDATE_MODE, DEFAULT_UPDATE_MODE, \
+    UPDATE_MODE_EVENT, CONF_WINDOW_MODE, DEFAULT_WINDOW_MODE, WINDOW_MODE_ROLLING, CONF_ENGINE, DEFAULT_ENGINE, ENGINE_NUMPY, STORAGE_VERSION, \
+    SAVE_DELAY, CONF_BACKFILL, DEFAULT_BACKFILL, CONF_SCHEDULES, CONF_INTERVAL, CONF_STEPS, \
+    CONF_STAGGER_SHARDS, DEFAULT_STAGGER_SHARDS, CONF_DEADBAND_ABS, CONF_DEADBAND_REL, CONF_MIN_PUBLISH_INTERVAL, \
+    CONF_HEARTBEAT, CONF_MISSED_TICK_POLICY, DEFAULT_MISSED_TICK_POLICY, MISSED_TICK_SKIP, MAX_CATCH_UP_TICKS, \
+    CONF_PROFILING, STATS_UPDATE_INTERVAL, CONF_ALGORITHMS, CONF_TIME_WEIGHTED, CONF_EXECUTION_MODE, \
+    DEFAULT_EXECUTION_MODE, EXECUTION_MODE_EXECUTOR, DATA_NUMBERS_READY, NUMBERS_READY_TIMEOUT, DATA_COORDINATOR, \
+    CONF_STATISTICS, STATISTICS_PUBLISH_MINUTE, ALGORITHM_SLOPE, ALGORITHM_MEAN_DELTA
+from .algorithms import ALGORITHMS, mean_delta
+from .buffer import TimeWindowBuffer, TrendBuffer
+from .coordinator import GroupIds
+from .history import async_get_history_samples, resample
+from .long_term_statistics import async_publish_rollups
+from .publisher import TrendPublisher
+from .record import TrackedEntity, trend_sensor_id
+from .rollup import TrendRollups
+from .scheduler import TrendGroup, TrendScheduler
+from .stats import TrendProfiler, TrendStats
+
+try:
+    from .batch import BatchTrendEngine
+except ImportError:  # NumPy is optional, the batch engine is disabled without it
+    BatchTrendEngine = None
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities):
-    """Set up BetterTrends sensors from a config entry."""
-    if DOMAIN in hass.data:
-        manager = hass.data[DOMAIN]
-        _LOGGER.debug("Adding new entities to existing BetterTrends Manager.")
-        new_entities = [e for e in entry.data.get("entities", []) if e not in manager._entities]
-        if new_entities:
-            manager.add_entities(new_entities)
-            better_trends_sensors = [BetterTrendsSensor(manager, entity_id) for entity_id in new_entities]
-            async_add_entities(better_trends_sensors)
+    """Set up the manager of a config entry and its trend sensors."""
+    managers = hass.data.setdefault(DOMAIN, {})
+    if entry.entry_id in managers:
+        manager = managers[entry.entry_id]
+        _LOGGER.debug("Adding new entities to existing %s.", manager.name)
+        await manager.async_set_entities(entry.data.get("entities", []))
+        hass.data[DATA_COORDINATOR].rebalance()
         return
 
     _LOGGER.debug("Starting BetterTrends setup with entry data: %s", entry.data)
@@ -28,9 +53,12 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities):
         _LOGGER.error("No entities configured for BetterTrends. Exiting setup.")
         return
 
-    # Initialize the manager
-    manager = BetterTrendsManager(hass, entities)
-    hass.data[DOMAIN] = manager  # Store the manager instance globally
+    # Every config entry has a manager of its own, balanced against the others by the coordinator
+    manager = BetterTrendsManager(hass, entities, entry.options, GroupIds(entry))
+    await manager.async_load_snapshot()  # Restore buffers and trends saved before the last shutdown
+    manager.async_add_sensors = async_add_entities  # For entities added later without a reload
+    managers[entry.entry_id] = manager
+    hass.data[DATA_COORDINATOR].register(entry.entry_id, manager)
     async_add_entities([manager])
 
     # Add user-defined entities
@@ -40,56 +68,187 @@ async def async_setup_entry(hass: HomeAssistant, entry, async_add_entities):
 
 
 class BetterTrendsManager(SensorEntity):
-    def __init__(self, hass: HomeAssistant, entities: list):
+    def __init__(self, hass: HomeAssistant, entities: list, options=None, ids: GroupIds = None):
         """Initialize the BetterTrends manager."""
+        options = options or {}
+        self._options = dict(options)
+        self._ids = ids or GroupIds()
+        self.async_add_sensors = None  # The sensor platform's async_add_entities
+        self._created = time.monotonic()
+        self._startup_seconds = None  # From creation until the main loop or listener started
+        self._startup_task = None
+        self._wakeup = asyncio.Event()  # Wakes the main loop early when the interval changed
+        self._pending_settings = None  # (interval, steps) to apply before the next tick
         self.hass = hass
         self._entities = set(entities)
+        self._update_mode = options.get(CONF_UPDATE_MODE, DEFAULT_UPDATE_MODE)
+        self._rolling = options.get(CONF_WINDOW_MODE, DEFAULT_WINDOW_MODE) == WINDOW_MODE_ROLLING
         self._interval = DEFAULT_INTERVAL
         self._trend_values = DEFAULT_TREND_VALUES
         self._trend_counter = 0
         self._state = "idle"
-        self._buffers = {}
-        self._counter_entity_id = TREND_COUNTER_ENTITY
+        self._statistics = options.get(CONF_STATISTICS, False)
+        self._records = {entity_id: self._new_record(entity_id) for entity_id in self._entities}
+        self._counter_entity_id = self._ids.counter
         self._running = False  # Initialize the _running flag
         self._task = None  # Initialize the _task attribute
+        self._unsub_state_listener = None  # Only used in event-driven mode
+        self._batch = None  # Only used by the NumPy batch engine
+        self._store = Store(hass, STORAGE_VERSION, self._ids.storage_key)
+        self._snapshot = None  # Loaded snapshot, applied once the manager is added
+        self._save_scheduled = False
+        self._backfill = options.get(CONF_BACKFILL, DEFAULT_BACKFILL)
+        self._scheduler = TrendScheduler()
+        self._schedules = options.get(CONF_SCHEDULES, {})  # Per-entity interval and steps overrides
+        self._groups = {}  # Schedule key -> TrendGroup
+        self._entity_groups = {}  # Entity id -> TrendGroup, only for entities with an override
+        self._default_entities = set()  # Entities on the global interval and steps
+        self._shards = max(1, int(options.get(CONF_STAGGER_SHARDS, DEFAULT_STAGGER_SHARDS)))
+        self._phase = 0.0  # Share of a step the first tick is delayed by, set by the coordinator
+        self._buckets = {}  # Schedule key -> entities split into stagger buckets
+        self._missed_tick_policy = options.get(CONF_MISSED_TICK_POLICY, DEFAULT_MISSED_TICK_POLICY)
+        self._missed_ticks = 0  # Ticks that were skipped or ran at least one full step late
+        self._stats = TrendStats()
+        self._profiler = TrendProfiler() if options.get(CONF_PROFILING, False) else None
+        self._algorithm_names = {
+            entity_id: name
+            for entity_id, name in options.get(CONF_ALGORITHMS, {}).items()
+            if name in ALGORITHMS  # The default mean delta works on the buffer directly
+        }
+        self._time_weighted = options.get(CONF_TIME_WEIGHTED, False)
+        self._executor = options.get(CONF_EXECUTION_MODE, DEFAULT_EXECUTION_MODE) == EXECUTION_MODE_EXECUTOR
+        self._publisher = TrendPublisher(
+            deadband_abs=float(options.get(CONF_DEADBAND_ABS, 0)),
+            deadband_rel=float(options.get(CONF_DEADBAND_REL, 0)) / 100,
+            min_interval=float(options.get(CONF_MIN_PUBLISH_INTERVAL, 0)),
+            heartbeat=float(options.get(CONF_HEARTBEAT, 0)),
+        )
+        for entity_id in self._entities:
+            self._assign_group(entity_id)
+
+        if options.get(CONF_ENGINE, DEFAULT_ENGINE) == ENGINE_NUMPY:
+            if self._update_mode == UPDATE_MODE_EVENT:
+                _LOGGER.warning("The NumPy engine only works in polling mode, using the default engine.")
+            elif BatchTrendEngine is None:
+                _LOGGER.warning("NumPy is not installed, using the default engine.")
+            else:
+                self._batch = BatchTrendEngine(sorted(self._default_entities), self._trend_values + 1)
+
+        if self._batch is not None and self._time_weighted:
+            _LOGGER.warning("The NumPy engine works on ticks, time-weighted trends are disabled.")
+            self._time_weighted = False
+
+        if self._time_weighted and self._algorithm_names:
+            _LOGGER.warning("Time-weighted trends replace the per-entity algorithms, which are ignored.")
+            self._algorithm_names = {}
+
+        if self._batch is not None and self._algorithm_names:
+            _LOGGER.warning("The NumPy engine only calculates the default trend, per-entity algorithms are ignored.")
+            self._algorithm_names = {}
+
+        if self._batch is not None and self._shards > 1:
+            _LOGGER.warning("The NumPy engine processes all entities at once, staggering is disabled.")
+            self._shards = 1
+        self._configured_shards = self._shards
+
+        slopes = [entity_id for entity_id, name in self._algorithm_names.items() if name == ALGORITHM_SLOPE]
+        if slopes and self._update_mode == UPDATE_MODE_EVENT:
+            _LOGGER.warning("The slope algorithm needs evenly spaced samples, using the default trend in event mode for: %s",
+                            ", ".join(slopes))
+            for entity_id in slopes:
+                del self._algorithm_names[entity_id]
+
+        if self._executor and self._update_mode == UPDATE_MODE_EVENT:
+            _LOGGER.warning("Trends are only calculated in the executor in polling mode, using the event loop.")
+            self._executor = False
 
     async def async_added_to_hass(self):
         """Handle the addition of the BetterTrends Manager entity."""
         _LOGGER.debug("BetterTrends Manager async_added_to_hass started.")
-        await asyncio.sleep(1)
-        await self._reload_settings()
-
-        # Ensure the counter entity exists
-        for attempt in range(5):
-            registry = er.async_get(self.hass)
-            existing_counter = registry.async_get(TREND_COUNTER_ENTITY)
-
-            if existing_counter:
-                _LOGGER.debug("Counter entity found: %s", existing_counter.entity_id)
-                self._counter_entity_id = existing_counter.entity_id
-                self._trend_counter = int(self.hass.states.get(self._counter_entity_id).state or 0)
-                break
-            else:
-                if attempt < 4:
-                    _LOGGER.warning("Counter entity not found. Retrying (%d/5)...", attempt + 1)
-                    await asyncio.sleep(1)
-                else:
-                    _LOGGER.error(
-                        "Expected counter entity 'TREND_COUNTER_ENTITY' not found in registry. "
-                        "Please check your configuration."
-                    )
-                    return
+        # A background task: waiting for the number entities and the backfill must not hold up the setup or
+        # Home Assistant's startup
+        self._startup_task = self.hass.async_create_background_task(
+            self._async_start(), f"{DOMAIN} {self._ids.entry_id} start"
+        )
+
+    async def _async_wait_for_numbers(self):
+        """Wait until the number platform wrote the interval, steps and counter states."""
+        events = self.hass.data.get(DATA_NUMBERS_READY, {}).get(self._ids.entry_id, {})
+        try:
+            async with asyncio.timeout(NUMBERS_READY_TIMEOUT):
+                await asyncio.gather(*(event.wait() for event in events.values()))
+        except TimeoutError:
+            missing = [entity_id for entity_id, event in events.items() if not event.is_set()]
+            _LOGGER.warning(
+                "BetterTrends number entities %s not ready after %d seconds, starting with default settings.",
+                ", ".join(missing), NUMBERS_READY_TIMEOUT,
+            )
+
+    async def _async_start(self):
+        """Restore state and start sampling once the number entities exist."""
+        await self._async_wait_for_numbers()
+
+        # Size the buffers for the current settings before restoring into them
+        self._interval = self._get_ha_state(self._ids.interval, DEFAULT_INTERVAL, int)
+        self._trend_values = self._get_ha_state(self._ids.steps, DEFAULT_TREND_VALUES, int)
+        await self._initialize_buffers()
+        self.async_on_remove(
+            async_track_state_change_event(
+                self.hass, [self._ids.interval, self._ids.steps], self._handle_settings_change
+            )
+        )
+
+        # Follow the counter entity if the user renamed it
+        counter_entity_id = er.async_get(self.hass).async_get_entity_id("number", DOMAIN, self._ids.counter)
+        if counter_entity_id:
+            _LOGGER.debug("Counter entity found: %s", counter_entity_id)
+            self._counter_entity_id = counter_entity_id
+        self._trend_counter = self._get_ha_state(self._counter_entity_id, 0, int)
+
+        self._restore_snapshot()
+
+        if self._backfill:
+            empty = [entity_id for entity_id in self._entities if not self._sample_count(entity_id)]
+            if len(empty) == len(self._entities) and not self._rolling:
+                # Nothing was restored, so seed a whole window and publish on the first tick
+                self._trend_counter = self._trend_values
+                for group in self._groups.values():
+                    group.counter = group.trend_values
+            await self._async_backfill(empty)
+
+        self.hass.states.async_set(self._counter_entity_id, self._trend_counter)
 
         # Reflect the counter state and start the main loop
         self._state = self._trend_counter
         self.async_write_ha_state()
         _LOGGER.debug("Trend counter reflected in state: %d", self._state)
-        self._start_task()  # Start the main loop
+
+        if self._update_mode == UPDATE_MODE_EVENT:
+            self._start_listener()  # Sample tracked entities whenever they change
+        else:
+            self._start_task()  # Start the main loop
+
+        self.async_on_remove(
+            async_track_time_interval(self.hass, self._async_update_stats, timedelta(seconds=STATS_UPDATE_INTERVAL))
+        )
+        if self._statistics:
+            self.async_on_remove(
+                async_track_time_change(
+                    self.hass, self._async_publish_statistics, minute=STATISTICS_PUBLISH_MINUTE, second=0
+                )
+            )
+
+        self._startup_seconds = time.monotonic() - self._created
+        _LOGGER.info("%s started in %.0f ms.", self.name, self._startup_seconds * 1000)
 
     async def _initialize_buffers(self):
-        """Initialize trend calculation buffers for all entities."""
-        for entity in self._entities:
-            self._buffers[entity] = []
+        """Initialize trend calculation buffers for all entities on the global schedule."""
+        if self._batch is not None:
+            # The batch matrix holds the samples, the records need no buffers of their own
+            self._batch = BatchTrendEngine(sorted(self._default_entities), self._trend_values + 1)
+        else:
+            for entity in self._default_entities:
+                self._reset_record(self._records[entity])
         self._trend_counter = 0
         self.hass.states.async_set(self._counter_entity_id, self._trend_counter)
         _LOGGER.debug("Trend counter reset to 0 and initialized.")
@@ -97,7 +256,210 @@ class BetterTrendsManager(SensorEntity):
     async def async_will_remove_from_hass(self):
         """Handle cleanup when the manager is removed."""
         _LOGGER.debug("Stopping BetterTrends Manager task.")
+        if self._startup_task and not self._startup_task.done():
+            self._startup_task.cancel()
+        self._stop_listener()
         await self._stop_task()
+        if self._statistics:
+            self._async_publish_statistics()  # Hours completed since the last publication
+        await self._store.async_save(self._snapshot_data())
+
+    async def async_load_snapshot(self):
+        """Load the snapshot saved by a previous run."""
+        self._snapshot = await self._store.async_load()
+        if self._snapshot:
+            trends = self._snapshot.get("trends", {})
+            for entity_id, record in self._records.items():
+                record.last_trend = trends.get(entity_id)
+            _LOGGER.debug("Loaded BetterTrends snapshot with %d trends.", len(trends))
+
+    def _restore_snapshot(self):
+        """Restore buffers and the counter from the loaded snapshot."""
+        snapshot, self._snapshot = self._snapshot, None
+        if not snapshot:
+            return
+
+        if snapshot.get("trend_values") != self._trend_values:
+            _LOGGER.info("Steps changed since the last snapshot. Discarding stored buffers.")
+            return
+        if snapshot.get("time_weighted", False) != self._time_weighted:
+            _LOGGER.info("Time weighting changed since the last snapshot. Discarding stored buffers.")
+            return
+
+        for entity_id, values in snapshot.get("buffers", {}).items():
+            if entity_id in self._entities:
+                self._load_samples(entity_id, values)
+
+        self._trend_counter = min(int(snapshot.get("counter", 0)), self._trend_values)
+        for key, counter in snapshot.get("groups", {}).items():
+            if key in self._groups:
+                self._groups[key].counter = min(int(counter), self._groups[key].trend_values)
+        _LOGGER.debug("Restored buffers for %d entities, counter at %d.", len(snapshot.get("buffers", {})),
+                      self._trend_counter)
+
+    async def _async_backfill(self, entity_ids):
+        """Seed the buffers of the given entities from recorder history."""
+        windows = {}
+        for entity_id in entity_ids:
+            interval, trend_values, counter = self._schedule_of(entity_id)
+            if self._update_mode == UPDATE_MODE_EVENT or self._rolling:
+                count = trend_values  # One sample short of a full window
+            else:
+                count = counter  # Align with the samples other entities collected this cycle
+            if count > 0:
+                windows[entity_id] = (interval, count)
+        if not windows:
+            return
+
+        # One query covering the longest window of all schedules
+        end_time = dt_util.utcnow()
+        span = max(interval * count for interval, count in windows.values())
+        start_time = end_time - timedelta(seconds=span)
+        try:
+            history = await async_get_history_samples(self.hass, list(windows), start_time, end_time)
+        except Exception as e:
+            _LOGGER.warning("Could not backfill trends from recorder history: %s", e)
+            return
+
+        end = end_time.timestamp()
+        for entity_id, points in history.items():
+            if entity_id not in windows or entity_id not in self._entities:
+                continue
+            interval, count = windows[entity_id]
+            if self._time_weighted:
+                values = [(timestamp, value) for timestamp, value in points if value is not None]
+            elif self._update_mode == UPDATE_MODE_EVENT:
+                values = [value for timestamp, value in points if value is not None][-count:]
+            else:
+                tick_times = [end - interval * (count - index) for index in range(count)]
+                values = resample(points, tick_times)
+            if values:
+                self._load_samples(entity_id, values)
+                _LOGGER.debug("Backfilled %d samples for %s.", len(values), entity_id)
+
+    def _load_samples(self, entity_id, values):
+        """Replace the buffer of an entity with the given samples, oldest first.
+
+        For time-weighted buffers the samples are (wall clock timestamp, value) pairs.
+        """
+        if self._in_batch(entity_id):
+            self._batch.load(entity_id, values)
+        elif self._time_weighted:
+            offset = time.time() - time.monotonic()
+            buffer = self._reset_record(self._records[entity_id])
+            for timestamp, value in values:
+                buffer.append(timestamp - offset, value)
+        else:
+            record = self._records[entity_id]
+            self._reset_record(record)
+            for value in values:
+                self._append_sample(record, value)
+
+    def _sample_count(self, entity_id) -> int:
+        """Return the number of samples buffered for an entity."""
+        if self._in_batch(entity_id):
+            return self._batch.count(entity_id)
+        buffer = self._records[entity_id].buffer
+        return 0 if buffer is None else len(buffer)
+
+    def _in_batch(self, entity_id) -> bool:
+        """Return True if the samples of an entity are kept by the batch engine."""
+        return self._batch is not None and entity_id in self._default_entities
+
+    def _assign_group(self, entity_id):
+        """Put an entity on its own schedule if it has an override, or on the global one."""
+        self._buckets.clear()
+        schedule = self._schedules.get(entity_id)
+        if not schedule:
+            self._default_entities.add(entity_id)
+            return
+
+        group = TrendGroup(int(schedule[CONF_INTERVAL]), int(schedule[CONF_STEPS]))
+        if group.key in self._groups:
+            group = self._groups[group.key]
+        else:
+            self._groups[group.key] = group
+            if self._running:
+                # New group while the loop runs
+                self._scheduler.schedule(self._align(self.hass.loop.time(), group.interval), (group, 0))
+        group.entities.add(entity_id)
+        self._entity_groups[entity_id] = group
+
+    def _unassign_group(self, entity_id):
+        """Remove an entity from its schedule, dropping groups that became empty."""
+        self._buckets.clear()
+        self._default_entities.discard(entity_id)
+        group = self._entity_groups.pop(entity_id, None)
+        if group:
+            group.entities.discard(entity_id)
+            if not group.entities:
+                del self._groups[group.key]
+
+    def _bucket(self, group, shard: int):
+        """Return the entities of a schedule that are processed in the given stagger bucket."""
+        entities = self._default_entities if group is None else group.entities
+        if self._shards == 1:
+            return entities
+
+        key = None if group is None else group.key
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            # Round-robin over a stable order keeps the buckets within one entity of each other
+            ordered = sorted(entities)
+            buckets = self._buckets[key] = [ordered[index::self._shards] for index in range(self._shards)]
+        return buckets[shard]
+
+    def _schedule_of(self, entity_id):
+        """Return (interval, trend_values, counter) of the schedule an entity is on."""
+        group = self._entity_groups.get(entity_id)
+        if group:
+            return group.interval, group.trend_values, group.counter
+        return self._interval, self._trend_values, self._trend_counter
+
+    def trend_settings(self, entity_id):
+        """Return the (interval, steps, algorithm) the trend of an entity is calculated with."""
+        interval, trend_values, _ = self._schedule_of(entity_id)
+        return interval, trend_values, self._algorithm_names.get(entity_id, ALGORITHM_MEAN_DELTA)
+
+    def _schedule_save(self):
+        """Write a snapshot after SAVE_DELAY seconds, unless one is already pending."""
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self._store.async_delay_save(self._snapshot_data, SAVE_DELAY)
+
+    def _snapshot_data(self) -> dict:
+        """Return the buffers, counter and last trends to persist."""
+        self._save_scheduled = False
+        if self._time_weighted:
+            offset = time.time() - time.monotonic()
+            buffers = {
+                entity_id: [(timestamp + offset, value) for timestamp, value in record.buffer]
+                for entity_id, record in self._records.items()
+                if self._has_samples(record)
+            }
+        else:
+            buffers = {
+                entity_id: list(record.buffer) for entity_id, record in self._records.items() if self._has_samples(record)
+            }
+        if self._batch is not None:
+            buffers.update({entity_id: self._batch.samples(entity_id) for entity_id in self._default_entities})
+        return {
+            "trend_values": self._trend_values,
+            "counter": self._trend_counter,
+            "groups": {key: group.counter for key, group in self._groups.items()},
+            "time_weighted": self._time_weighted,
+            "buffers": buffers,
+            "trends": {
+                entity_id: record.last_trend
+                for entity_id, record in self._records.items()
+                if record.last_trend is not None
+            },
+        }
+
+    def restored_trend(self, entity_id):
+        """Return the last trend value published for an entity, if known."""
+        record = self._records.get(entity_id)
+        return record.last_trend if record else None
 
     async def _stop_task(self):
         """Stop the background task, if running."""
@@ -109,25 +471,6 @@ class BetterTrendsManager(SensorEntity):
             except asyncio.CancelledError:
                 pass  # Ignore the cancellation exception
 
-    async def _restart_task(self):
-        """Restart the background task."""
-        _LOGGER.debug("Restarting main_loop")
-
-        # Ensure buffers are reset
-        await self._initialize_buffers()
-
-        # Stop the current task
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task  # Properly await the cancellation
-            except asyncio.CancelledError:
-                _LOGGER.debug("Previous task cancelled successfully.")
-            self._task = None  # Clear the reference to the old task
-
-        # Start the new task
-        self._start_task()
-
     def _start_task(self):
         """Start the main processing loop."""
         if not self._running:
@@ -137,15 +480,146 @@ class BetterTrendsManager(SensorEntity):
             else:
                 _LOGGER.warning("Attempted to start a new task, but an existing task is still running.")
 
+    def _start_listener(self):
+        """Subscribe to state changes of the tracked entities."""
+        self._stop_listener()
+        self._unsub_state_listener = async_track_state_change_event(
+            self.hass, list(self._entities), self._handle_state_change
+        )
+        _LOGGER.debug("Listening for state changes of %d entities.", len(self._entities))
+
+    def _stop_listener(self):
+        """Unsubscribe from state changes, if subscribed."""
+        if self._unsub_state_listener:
+            self._unsub_state_listener()
+            self._unsub_state_listener = None
+
+    @callback
+    def _handle_state_change(self, event):
+        """Sample a tracked entity as soon as it reports a new state."""
+        entity_id = event.data["entity_id"]
+        old_state = event.data["old_state"]
+        new_state = event.data["new_state"]
+        if old_state is not None and new_state is not None and old_state.state == new_state.state:
+            return  # Attribute updates and forced writes are not new samples
+
+        current_value = self._read_sample(entity_id, new_state)
+        if current_value is None:
+            return
+
+        record = self._records[entity_id]
+        buffer = record.buffer if record.buffer is not None else self._reset_record(record)
+        self._append_sample(record, current_value, new_state.last_updated.timestamp())
+
+        # A window holds the same number of samples as one polling cycle
+        if buffer.full:
+            self._publish_trend(record)
+            if not self._rolling:
+                self._clear_buffer(record)
+
+        self._schedule_save()
+
+    @callback
+    def _handle_settings_change(self, event):
+        """Take a new interval or steps setting, applied before the next tick.
+
+        The main loop applies it between two ticks (see _apply_settings), so buffers are
+        never resized while a tick is being processed. Without the main loop it applies
+        right away.
+        """
+        new_state = event.data["new_state"]
+        if new_state is None or new_state.state in ("unknown", "unavailable"):
+            return  # The number entity is being removed or restarted
+
+        settings = (
+            self._get_ha_state(self._ids.interval, self._interval, int),
+            self._get_ha_state(self._ids.steps, self._trend_values, int),
+        )
+        self._pending_settings = None if settings == (self._interval, self._trend_values) else settings
+        if self._pending_settings is None:
+            return
+        if not self._running:
+            self._apply_settings()
+        elif settings[0] != self._interval:
+            self._wakeup.set()  # Move the next tick of the global schedule to the new interval
+
+    def _apply_settings(self):
+        """Resize the buffers to the pending interval and steps, keeping the collected samples."""
+        if self._pending_settings is None:
+            return
+        self._interval, self._trend_values = self._pending_settings
+        self._pending_settings = None
+        if self._batch is not None:
+            self._batch.resize(self._trend_values + 1)
+        else:
+            for entity_id in self._default_entities:
+                self._resize_record(self._records[entity_id])
+
+        if self._trend_counter > self._trend_values:
+            self._trend_counter = self._trend_values  # The shorter window is already complete
+            self.hass.states.async_set(self._counter_entity_id, self._trend_counter)
+        self._schedule_save()
+        _LOGGER.debug(
+            "Settings changed: interval=%d, trend_values=%d, buffers resized.", self._interval, self._trend_values
+        )
+
     async def _main_loop(self):
+        loop = asyncio.get_running_loop()
+
+        # The first bucket of the global schedule (None) and of every group is due at the next slot of its phase.
+        # Each bucket queues the next one 1/shards of an interval later, spreading the work
+        # evenly over the interval instead of processing every entity in one burst.
+        # Deadlines are absolute loop times, so processing time does not add up to drift.
+        # The coordinator gives every manager a phase, so the managers of several entries do not tick together.
+        self._scheduler.clear()
+        self._wakeup.clear()
+        self._apply_settings()
+        now = loop.time()
+        self._scheduler.schedule(self._align(now, self._interval), (None, 0))
+        for group in self._groups.values():
+            self._scheduler.schedule(self._align(now, group.interval), (group, 0))
+
         while self._running:
             try:
-                # Reload settings dynamically before processing trends
-                await self._reload_settings()
+                due, item = self._scheduler.pop()
+                group, shard = item
+                delay = due - loop.time()
+                if delay > 0:
+                    try:
+                        async with asyncio.timeout(delay):
+                            await self._wakeup.wait()
+                    except TimeoutError:
+                        pass
+                    else:
+                        # The interval changed, the global schedule is due one new step from now at the latest
+                        self._wakeup.clear()
+                        self._apply_settings()
+                        self._scheduler.schedule(due, item)
+                        latest = self._align(loop.time(), self._interval)
+                        self._scheduler.reschedule(lambda queued: queued[0] is None, lambda queued: min(queued, latest))
+                        continue
+
+                self._apply_settings()  # Settings changed since the last tick
+                shard %= self._shards  # The coordinator may have changed the number of buckets while waiting
+                lag = loop.time() - due
+                started = time.perf_counter()
+                if group is None:
+                    deadline, skipped = self._next_deadline(due, self._interval)
+                    self._scheduler.schedule(deadline, (None, (shard + 1 + skipped) % self._shards))
+
+                    _LOGGER.debug("Processing trends for entities on the global schedule (bucket %d).", shard)
+                    await self._process_trends(shard)  # Await the trend processing
+                elif self._groups.get(group.key) is group:
+                    deadline, skipped = self._next_deadline(due, group.interval)
+                    self._scheduler.schedule(deadline, (group, (shard + 1 + skipped) % self._shards))
 
-                _LOGGER.debug("Processing trends for all entities.")
-                await self._process_trends()  # Await the trend processing
-                await asyncio.sleep(self._interval)
+                    _LOGGER.debug("Processing trends for %s (bucket %d).", group, shard)
+                    await self._process_group(group, shard)
+                else:
+                    continue  # The group was removed
+                self._skip_ticks(group, shard, skipped)
+                self._stats.record_tick(time.perf_counter() - started, lag)
+                self._schedule_save()
 
             except asyncio.CancelledError:
                 _LOGGER.debug("Main loop cancelled.")
@@ -153,87 +627,382 @@ class BetterTrendsManager(SensorEntity):
             except Exception as e:
                 _LOGGER.error("Error in trend processing loop: %s", e)
 
-    async def _process_trends(self):
-        """Process trend calculations for all configured entities."""
-        for entity_id in self._entities:
+    def _align(self, moment: float, interval: float) -> float:
+        """Return the first slot of this manager at or after ``moment``.
+
+        Slots are 1/shards of an interval apart, counted from loop time 0 and offset by
+        the phase, so managers that started at different times still tick at their own
+        share of every step.
+        """
+        step = interval / self._shards
+        return moment + (self._phase * step - moment) % step
+
+    def _next_deadline(self, due: float, interval: float):
+        """Return the deadline of the bucket following one that was due at ``due``, and the buckets skipped.
+
+        If the current bucket ran at least one full step late, the missed tick policy
+        decides: catch up (the next deadline is already in the past, so the missed ticks
+        run back to back) or skip (realign to the next deadline in the future). Catching
+        up is limited to MAX_CATCH_UP_TICKS steps.
+        """
+        step = interval / self._shards
+        lag = self.hass.loop.time() - due
+        if lag < step:
+            return due + step, 0
+
+        missed = int(lag // step)
+        if self._missed_tick_policy == MISSED_TICK_SKIP or missed > MAX_CATCH_UP_TICKS:
+            self._missed_ticks += missed
+            _LOGGER.warning("BetterTrends fell %.1f seconds behind schedule, skipping %d tick(s).", lag, missed)
+            return due + step * (missed + 1), missed
+
+        self._missed_ticks += 1
+        _LOGGER.debug("BetterTrends is %.1f seconds behind schedule, catching up.", lag)
+        return due + step, 0
+
+    def _skip_ticks(self, group, shard: int, skipped: int):
+        """Move the window counter of a schedule on by the ticks that were skipped after ``shard``.
+
+        A tumbling window then still ends interval x (steps + 1) seconds after it started,
+        with fewer samples. If it ended during the gap, the next tick publishes it.
+        """
+        completed = (shard + skipped + 1) // self._shards - (shard + 1) // self._shards
+        if not completed:
+            return
+        if group is not None:
+            group.counter = min(group.counter + completed, group.trend_values)
+            return
+        counter = min(self._trend_counter + completed, self._trend_values)
+        if counter != self._trend_counter:
+            self._trend_counter = counter
+            self.hass.states.async_set(self._counter_entity_id, self._trend_counter)
+
+    async def _process_trends(self, shard: int = 0):
+        """Process trend calculations for one bucket of the entities on the global schedule."""
+        # The counter moves on once every bucket was processed, decided before the buckets can change
+        last = shard == self._shards - 1
+        if self._batch is not None:
+            await self._process_trends_batch()
+        else:
+            due = self._sample_entities(self._bucket(None, shard), self._trend_counter >= self._trend_values)
+            await self._publish_due(due)
+
+        if last:
+            self._advance_counter()
+
+    async def _process_group(self, group: TrendGroup, shard: int = 0):
+        """Process trend calculations for one bucket of a group with its own schedule."""
+        last = shard == self._shards - 1
+        due = self._sample_entities(self._bucket(group, shard), group.counter >= group.trend_values)
+        await self._publish_due(due)
+        if last:
+            group.counter = (group.counter + 1) % (group.trend_values + 1)
+
+    def _sample_entities(self, entity_ids, window_complete: bool) -> list:
+        """Sample the given entities and return the records whose trend is due."""
+        profiler = self._profiler
+        due = []
+        for entity_id in entity_ids:
             _LOGGER.debug("Processing trends for entity_id: %s (expected monitored entity)", entity_id)
 
+            if profiler:
+                started = time.perf_counter()
             state = self.hass.states.get(entity_id)
-            if not state or state.state in (None, "unknown"):
-                _LOGGER.warning("Skipping entity %s: State unavailable or unknown.", entity_id)
+            current_value = self._read_sample(entity_id, state)
+            if profiler:
+                sampled = time.perf_counter()
+                profiler.record(entity_id, "read", sampled - started)
+            if current_value is None:
                 continue
 
-            try:
-                current_value = float(state.state)
-            except ValueError:
-                _LOGGER.error("Skipping entity %s: State is not numeric.", entity_id)
-                continue
-
-            buffer = self._buffers.setdefault(entity_id, [])
-            buffer.append(current_value)
+            record = self._records[entity_id]
+            buffer = record.buffer if record.buffer is not None else self._reset_record(record)
+            self._append_sample(record, current_value, state.last_updated.timestamp())
+            if profiler:
+                profiler.record(entity_id, "buffer", time.perf_counter() - sampled)
 
             _LOGGER.debug("Buffer for entity %s: %s", entity_id, buffer)
 
-            if self._trend_counter >= self._trend_values:
-                # Ensure _calculate_trend is called correctly with entity_id
-                trend_value = self._calculate_trend(entity_id, buffer)
-                sensor_entity_id = f"sensor.bettertrends_{entity_id.replace('.', '_')}"
+            if self._rolling:
+                # Rolling windows publish on every tick once they are full
+                if buffer.full:
+                    due.append(record)
+            elif window_complete:
+                due.append(record)
+            else:
+                _LOGGER.debug("Buffer for %s is not yet full. Skipping trend update.", entity_id)
+        return due
 
-                if trend_value is not None:
-                    self.hass.states.async_set(sensor_entity_id, trend_value)
-                    _LOGGER.info("Updated trend for %s: %s", sensor_entity_id, trend_value)
+    async def _publish_due(self, due: list):
+        """Calculate and write the trends of the given records, then start new tumbling windows.
 
-                # Clear the buffer after processing
-                self._buffers[entity_id] = []
+        In executor mode the calculations run in a worker thread on copies taken on the
+        event loop (see _snapshot_trend), so settings changes and removals meanwhile
+        cannot affect them. The results are written back on the event loop in one pass.
+        """
+        now = time.monotonic()
+        if self._executor and due:
+            snapshots = [self._snapshot_trend(record, now) for record in due]
+            if any(samples is not None for _, samples, _ in snapshots):
+                results = await self.hass.async_add_executor_job(self._compute_snapshots, snapshots, now)
             else:
-                _LOGGER.debug("Buffer for %s is not yet full. Skipping trend update.", entity_id)
+                results = self._compute_snapshots(snapshots, now)  # Nothing left to calculate
+        else:
+            results = self._compute_trends(due, now)
+
+        profiler = self._profiler
+        for record, trend_value, attributes, elapsed in results:
+            if self._records.get(record.entity_id) is not record:
+                continue  # Removed while the trends were calculated
+            if profiler:
+                started = time.perf_counter()
+            if trend_value is not None:
+                self._write_trend(record, trend_value, attributes)
+            if profiler:
+                profiler.record(record.entity_id, "publish", elapsed + time.perf_counter() - started)
+
+        if not self._rolling:
+            for record in due:
+                self._clear_buffer(record)
+
+    def _compute_trends(self, records: list, now: float) -> list:
+        """Return (record, trend value, attributes, seconds spent) for each record."""
+        results = []
+        profiler = self._profiler
+        for record in records:
+            started = time.perf_counter() if profiler else 0.0
+            trend_value, attributes = self._compute_trend(record, now)
+            results.append((record, trend_value, attributes, time.perf_counter() - started if profiler else 0.0))
+        return results
+
+    def _snapshot_trend(self, record: TrackedEntity, now: float):
+        """Return (record, samples, result) to calculate the trend of a record from off the event loop.
+
+        Time-weighted windows are integrated over all their samples, so ``samples`` is a
+        copy of them and ``result`` is None. Everything else is calculated right away
+        from running sums, or from the sensor state without samples, and ``result`` is
+        the (trend value, attributes, seconds spent) of it.
+        """
+        if self._time_weighted and self._has_samples(record):
+            return record, record.buffer.copy(), None
+        started = time.perf_counter()
+        trend_value, attributes = self._compute_trend(record, now)
+        return record, None, (trend_value, attributes, time.perf_counter() - started)
+
+    def _compute_snapshots(self, snapshots: list, now: float) -> list:
+        """Return (record, trend value, attributes, seconds spent) for each snapshot, reading only the copies."""
+        results = []
+        for record, samples, result in snapshots:
+            if samples is None:
+                results.append((record, *result))
+                continue
+            started = time.perf_counter()
+            trend_value, attributes = self._time_weighted_trend(samples, now)
+            results.append((record, trend_value, attributes, time.perf_counter() - started))
+        return results
+
+    async def _process_trends_batch(self):
+        """Sample all entities on the global schedule and compute their trends in one vectorized pass."""
+        samples = {}
+        for entity_id in self._default_entities:
+            current_value = self._read_sample(entity_id, self.hass.states.get(entity_id))
+            if current_value is not None:
+                samples[entity_id] = current_value
+        self._batch.push(samples)
+
+        if self._rolling:
+            mask = self._batch.full_rows()
+        elif self._trend_counter >= self._trend_values:
+            mask = self._batch.filled_rows()
+        else:
+            _LOGGER.debug("Batch buffers are not yet full. Skipping trend update.")
+            return
 
+        # A copy of the rows and their entity ids, so removing or resizing rows meanwhile cannot mix them up
+        snapshot = self._batch.snapshot(mask)
+        if self._executor:
+            # NumPy releases the GIL for the heavy part, the loop keeps running meanwhile
+            results = await self.hass.async_add_executor_job(snapshot.compute)
+        else:
+            results = snapshot.compute()
+
+        for entity_id, trend_value, mean, slope, minimum, maximum in results:
+            record = self._records.get(entity_id)
+            if record is None:
+                continue  # Removed while the trends were calculated
+            self._write_trend(
+                record,
+                trend_value,
+                {"mean": round(mean, 2), "slope": round(slope, 4), "min": minimum, "max": maximum},
+            )
+
+        if not self._rolling:
+            self._batch.reset()
+
+    def _advance_counter(self):
+        """Increment the trend counter and reflect it in the counter entity."""
         # Increment trend counter
         previous_counter = self._trend_counter
         self._trend_counter = (self._trend_counter + 1) % (self._trend_values + 1)
 
         if self._trend_counter != previous_counter:
-            self.hass.states.async_set(TREND_COUNTER_ENTITY, self._trend_counter)
+            self.hass.states.async_set(self._counter_entity_id, self._trend_counter)
             _LOGGER.debug("Trend counter updated from %d to %d", previous_counter, self._trend_counter)
         else:
             _LOGGER.debug("Trend counter remains unchanged at %d", self._trend_counter)
 
-    async def _reload_settings(self):
-        """Reload settings for interval, steps, and counter."""
-        interval_entity = self.hass.states.get(TREND_INTERVAL_ENTITY)
-        steps_entity = self.hass.states.get(TREND_VALUES_ENTITY)
+    def _reset_record(self, record: TrackedEntity) -> TrendBuffer:
+        """Give an entity an empty buffer sized for one trend window of its schedule, and return it.
 
-        new_interval = int(interval_entity.state) if interval_entity else DEFAULT_INTERVAL
-        new_trend_values = int(steps_entity.state) if steps_entity else DEFAULT_TREND_VALUES
+        If the entity uses a trend algorithm, a fresh instance for the same window is created too.
+        """
+        group = self._entity_groups.get(record.entity_id)
+        trend_values = group.trend_values if group else self._trend_values
+        interval = group.interval if group else self._interval
+        if self._time_weighted:
+            record.buffer = TimeWindowBuffer(interval * trend_values)
+            record.updated = None
+            return record.buffer
 
-        if self._interval != new_interval or self._trend_values != new_trend_values:
-            self._interval = new_interval
-            self._trend_values = new_trend_values
-            await self._restart_task()
+        name = self._algorithm_names.get(record.entity_id)
+        record.algorithm = ALGORITHMS[name](trend_values + 1, interval) if name else None
+        record.buffer = TrendBuffer(trend_values + 1)
+        return record.buffer
 
-        _LOGGER.debug(
-            "Settings reloaded: interval=%d, trend_values=%d, counter=%d",
-            self._interval,
-            self._trend_values,
-            self._trend_counter,
-        )
+    def _resize_record(self, record: TrackedEntity):
+        """Fit the buffer of an entity to the window of its schedule, keeping the newest samples."""
+        if record.buffer is None:
+            self._reset_record(record)
+            return
+
+        group = self._entity_groups.get(record.entity_id)
+        trend_values = group.trend_values if group else self._trend_values
+        interval = group.interval if group else self._interval
+        if self._time_weighted:
+            record.buffer.resize(interval * trend_values)
+            return
+
+        record.buffer.resize(trend_values + 1)
+        name = self._algorithm_names.get(record.entity_id)
+        if name:
+            # Algorithms depend on the window and interval, replay the kept samples into a new instance
+            record.algorithm = ALGORITHMS[name](trend_values + 1, interval)
+            for value in record.buffer:
+                record.algorithm.update(value)
+
+    def _new_record(self, entity_id) -> TrackedEntity:
+        """Return the record of a newly tracked entity."""
+        record = TrackedEntity(entity_id)
+        if self._statistics:
+            record.rollups = TrendRollups()
+        return record
+
+    def _append_sample(self, record: TrackedEntity, value: float, updated: float = None):
+        """Append a sample to an entity's buffer and feed it to its trend algorithm.
 
-    def _calculate_trend(self, entity_id, buffer: list[float]) -> float:
+        Time-weighted samples are stamped with ``updated``, the time the state was
+        reported at, so a value weighs as long as the sensor held it and not one tick.
+        A state that was already sampled is not appended again.
+        """
+        if self._time_weighted:
+            now = time.monotonic()
+            if updated is None:
+                record.buffer.append(now, value)
+                return
+            if updated == record.updated:
+                return
+            record.updated = updated
+            timestamp = min(updated - time.time() + now, now)
+            newest = record.buffer.newest
+            record.buffer.append(timestamp if newest is None else max(timestamp, newest), value)
+            return
+
+        evicted = record.buffer.append(value)
+        if record.algorithm:
+            record.algorithm.update(value, evicted)
+
+    @staticmethod
+    def _has_samples(record: TrackedEntity) -> bool:
+        """Return True if the buffer of an entity exists and holds samples."""
+        return record.buffer is not None and len(record.buffer) > 0
+
+    def _clear_buffer(self, record: TrackedEntity):
+        """Start a new window for an entity."""
+        record.buffer.clear()
+        if record.algorithm:
+            record.algorithm.reset()
+
+    def _read_sample(self, entity_id, state):
+        """Return the numeric value of a state, or None if it cannot be sampled."""
+        if not state or state.state in (None, "unknown"):
+            _LOGGER.warning("Skipping entity %s: State unavailable or unknown.", entity_id)
+            self._stats.skipped += 1
+            return None
+
+        try:
+            value = float(state.state)
+        except ValueError:
+            _LOGGER.error("Skipping entity %s: State is not numeric.", entity_id)
+            self._stats.skipped += 1
+            return None
+
+        self._stats.processed += 1
+        return value
+
+    def _publish_trend(self, record: TrackedEntity):
+        """Calculate the trend of a full buffer and write it to the trend sensor."""
+        trend_value, attributes = self._compute_trend(record)
+        if trend_value is not None:
+            self._write_trend(record, trend_value, attributes)
+
+    def _compute_trend(self, record: TrackedEntity, now: float = None):
+        """Return the trend value and attributes of an entity, from its samples up to ``now``."""
+        algorithm = record.algorithm
+        if algorithm:
+            return algorithm.value(), algorithm.attributes()
+        if self._time_weighted and self._has_samples(record):
+            return self._time_weighted_trend(record.buffer, now)
+        return self._calculate_trend(record), None
+
+    @staticmethod
+    def _time_weighted_trend(buffer: TimeWindowBuffer, now: float = None):
+        """Return the trend value and attributes of a time-weighted window with samples."""
+        return mean_delta(buffer.last(), buffer.mean(now)), {"slope_per_hour": round(buffer.slope(now) * 3600, 3)}
+
+    def _write_trend(self, record: TrackedEntity, trend_value, attributes=None):
+        """Write a trend value to the trend sensor of an entity, unless the change is insignificant."""
+        entity_id = record.entity_id
+        sensor_entity_id = record.sensor_entity_id
+        if record.rollups is not None:
+            # Every calculated value counts for the statistics, also those the deadband holds back
+            record.rollups.add(time.time(), trend_value)
+        now = time.monotonic()
+        publish, heartbeat = self._publisher.check(entity_id, trend_value, now)
+        if not publish:
+            _LOGGER.debug("Trend for %s within deadband or rate limit: %s", sensor_entity_id, trend_value)
+            return
+
+        # A heartbeat must reach the recorder even if the value did not change
+        self.hass.states.async_set(sensor_entity_id, trend_value, attributes, force_update=heartbeat)
+        self._publisher.record(entity_id, trend_value, now)
+        self._stats.record_write(now)
+        record.last_trend = trend_value
+        _LOGGER.info("Updated trend for %s: %s", sensor_entity_id, trend_value)
+
+    def _calculate_trend(self, record: TrackedEntity, now: float = None) -> float:
         """Calculate the trend-adjusted value."""
-        if not buffer:
-            state = self.hass.states.get(f"sensor.bettertrends_{entity_id.replace('.', '_')}")
+        buffer = record.buffer
+        if not self._has_samples(record):
+            state = self.hass.states.get(record.sensor_entity_id)
             if state:
                 return float(state.state)
             return None
 
-        avg = sum(buffer) / len(buffer)
-        last = float(self.hass.states.get(entity_id).state)  # Match monitored entity format
-        trend_value = round(last - avg, 2)
-
-        if trend_value == -0.0:
-            trend_value = 0.0
+        avg = buffer.mean(now) if self._time_weighted else buffer.mean()
+        last = buffer.last()  # Most recent sample of the monitored entity
+        trend_value = mean_delta(last, avg)
 
-        _LOGGER.debug("Trend value for %s: %s", entity_id, trend_value)
+        _LOGGER.debug("Trend value for %s: %s", record.entity_id, trend_value)
         return trend_value
 
     def _get_ha_state(self, entity_id, default=None, cast_type=str):
@@ -246,27 +1015,176 @@ class BetterTrendsManager(SensorEntity):
                 _LOGGER.warning("Invalid state for %s: %s", entity_id, state.state)
         return default
 
+    @property
+    def entity_count(self) -> int:
+        """Return the number of tracked entities."""
+        return len(self._entities)
+
+    @property
+    def stagger_shards(self) -> int:
+        """Return the stagger buckets per interval the options ask for."""
+        return self._configured_shards
+
+    @property
+    def options(self) -> dict:
+        """Return the options the manager was created with."""
+        return self._options
+
+    def tracks(self, entity_id: str) -> bool:
+        """Return True if the manager calculates the trend of an entity."""
+        return entity_id in self._entities
+
+    @callback
+    def set_balance(self, shards: int, phase: float):
+        """Apply the stagger buckets and tick phase assigned by the coordinator.
+
+        Queued ticks move to the next slot of the new phase and buckets.
+        """
+        changed = phase != self._phase
+        if self._batch is None and shards != self._shards:
+            self._shards = shards
+            self._buckets.clear()
+            changed = True
+            _LOGGER.debug("%s uses %d stagger buckets.", self.name, shards)
+        self._phase = phase
+        if not changed:
+            return
+        self._scheduler.reschedule(lambda queued: queued[0] is None, lambda due: self._align(due, self._interval))
+        for group in self._groups.values():
+            self._scheduler.reschedule(
+                lambda queued, group=group: queued[0] is group, lambda due, group=group: self._align(due, group.interval)
+            )
+
     def add_entities(self, new_entities: list):
         """Dynamically add new entities to the manager."""
+        added = [entity_id for entity_id in new_entities if entity_id not in self._entities]
         for entity_id in new_entities:
             if entity_id not in self._entities:
                 self._entities.add(entity_id)
-                if entity_id not in self._buffers:
-                    self._buffers[entity_id] = []
+                self._assign_group(entity_id)
+                record = self._records[entity_id] = self._new_record(entity_id)
+                if self._in_batch(entity_id):
+                    self._batch.add(entity_id)
+                else:
+                    self._reset_record(record)
                 _LOGGER.info("Added entity %s to BetterTrends.", entity_id)
 
+        if self._unsub_state_listener:
+            self._start_listener()  # Resubscribe to include the new entities
+
+        if self._backfill and added and self.hass:
+            self.hass.async_create_background_task(self._async_backfill(added), f"{DOMAIN} {self._ids.entry_id} backfill")
+
+    async def async_set_entities(self, entity_ids: list):
+        """Track exactly the given entities, adding and removing trend sensors without a restart."""
+        wanted = set(entity_ids)
+        added = [entity_id for entity_id in entity_ids if entity_id not in self._entities]
+        removed = [entity_id for entity_id in self._entities if entity_id not in wanted]
+
+        if added:
+            self.add_entities(added)
+            if self.async_add_sensors:
+                self.async_add_sensors([BetterTrendsSensor(self, entity_id) for entity_id in added])
+
+        registry = er.async_get(self.hass)
+        sensor_entity_ids = [self._records[entity_id].sensor_entity_id for entity_id in removed]
+        self.remove_entities(removed)
+        for sensor_entity_id in sensor_entity_ids:
+            registered = registry.async_get_entity_id("sensor", DOMAIN, sensor_entity_id)
+            if registered:
+                registry.async_remove(registered)  # Also removes the entity and its state
+            else:
+                self.hass.states.async_remove(sensor_entity_id)
+
+        if added or removed:
+            self._schedule_save()
+            _LOGGER.debug("%s added %d and removed %d entities.", self.name, len(added), len(removed))
+
     def remove_entity(self, entity_id: str):
         """Dynamically remove an entity from the manager."""
-        if entity_id in self._entities:
+        self.remove_entities([entity_id])
+
+    def remove_entities(self, entity_ids: list):
+        """Dynamically remove entities from the manager, resubscribing to state changes once."""
+        removed = False
+        for entity_id in entity_ids:
+            if entity_id not in self._entities:
+                continue
             self._entities.remove(entity_id)
-            if entity_id in self._buffers:
-                del self._buffers[entity_id]
+            del self._records[entity_id]
+            if self._batch is not None:
+                self._batch.remove(entity_id)
+            self._unassign_group(entity_id)
+            self._publisher.forget(entity_id)
+            removed = True
             _LOGGER.info("Removed entity %s from BetterTrends.", entity_id)
 
+        if removed and self._unsub_state_listener:
+            self._start_listener()
+
+    @callback
+    def _async_update_stats(self, now=None):
+        """Write the counter to the manager entity if it moved on since the last write.
+
+        The diagnostics change all the time, so they are not state attributes (which would
+        mean a state change and a recorder row every time) but come from diagnostics().
+        """
+        if self._state != self._trend_counter:
+            self._state = self._trend_counter
+            self.async_write_ha_state()
+
+        if self._profiler:
+            _LOGGER.debug("BetterTrends profile: %s", self._profiler.summary())
+
+    @callback
+    def _async_publish_statistics(self, now=None):
+        """Publish the hours completed since the last call as long-term statistics."""
+        if "recorder" not in self.hass.config.components:
+            return
+        async_publish_rollups(self.hass, self._records.values())
+
+    def rollups(self, sensor_entity_id: str):
+        """Return the rollups of the trend written to ``sensor_entity_id``, if it has any."""
+        for record in self._records.values():
+            if record.sensor_entity_id == sensor_entity_id:
+                return record.rollups
+        return None
+
+    def _buffer_bytes(self) -> int:
+        """Return the memory used by all sample buffers and rollups, in bytes."""
+        total = sum(record.buffer.nbytes for record in self._records.values() if record.buffer is not None)
+        total += sum(record.rollups.nbytes for record in self._records.values() if record.rollups is not None)
+        if self._batch is not None:
+            total += self._batch.nbytes
+        return total
+
+    def diagnostics(self) -> dict:
+        """Return diagnostics of the trend engine, for the diagnostics download of the config entry."""
+        last, p50, p95 = self._stats.durations()
+        attributes = {
+            "last_duration_ms": round(last * 1000, 3),
+            "p50_duration_ms": round(p50 * 1000, 3),
+            "p95_duration_ms": round(p95 * 1000, 3),
+            "last_lag_ms": round(self._stats.last_lag * 1000, 3),
+            "max_lag_ms": round(self._stats.max_lag * 1000, 3),
+            "missed_ticks": self._missed_ticks,
+            "entities_processed": self._stats.tick_processed,
+            "entities_skipped": self._stats.tick_skipped,
+            "entities_processed_total": self._stats.processed,
+            "entities_skipped_total": self._stats.skipped,
+            "buffer_bytes": self._buffer_bytes(),
+            "state_writes_per_minute": self._stats.writes_per_minute(time.monotonic()),
+        }
+        if self._startup_seconds is not None:
+            attributes["startup_ms"] = round(self._startup_seconds * 1000, 1)
+        if self._profiler:
+            attributes["profile"] = self._profiler.summary()
+        return attributes
+
     @property
     def name(self):
         """Return the name of the manager."""
-        return "BetterTrends Manager"
+        return f"{self._ids.label} Manager"
 
     @property
     def state(self):
@@ -286,7 +1204,7 @@ class BetterTrendsSensor(SensorEntity):
         """Initialize a BetterTrends sensor."""
         self._manager = manager
         self._entity_id = entity_id
-        self._unique_id = f"sensor.bettertrends_{entity_id.replace('.', '_')}"
+        self._unique_id = trend_sensor_id(entity_id)
         _LOGGER.debug("Initializing BetterTrends sensor: %s with unique_id: %s", self._entity_id, self._unique_id)
 
     async def async_added_to_hass(self):
@@ -300,6 +1218,9 @@ class BetterTrendsSensor(SensorEntity):
                 "State for %s already exists: %s. Reusing state.", self.unique_id, existing_state.state
             )
             self.hass.states.async_set(self.unique_id, existing_state.state)
+        elif (restored := self._manager.restored_trend(self._entity_id)) is not None:
+            _LOGGER.debug("Restoring trend for %s from snapshot: %s", self.unique_id, restored)
+            self.hass.states.async_set(self.unique_id, restored)
         else:
             _LOGGER.debug("No valid existing state for %s. Initializing state to 0.0.", self.unique_id)
             self.hass.states.async_set(self.unique_id, 0.0)
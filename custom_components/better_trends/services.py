@@ -0,0 +1,153 @@
+"""Services of the BetterTrends integration."""
+import heapq
+import logging
+import os
+
+import voluptuous as vol
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .algorithms import ALGORITHMS
+from .const import DOMAIN, DATA_COORDINATOR, DEFAULT_INTERVAL, DEFAULT_TREND_VALUES, CONF_INTERVAL, CONF_STEPS, \
+    CONF_ALGORITHM, ALGORITHM_MEAN_DELTA, CONF_WINDOW_MODE, DEFAULT_WINDOW_MODE, WINDOW_MODE_TUMBLING, \
+    WINDOW_MODE_ROLLING, CONF_TIME_WEIGHTED, CONF_DEADBAND_ABS, CONF_DEADBAND_REL, CONF_MIN_PUBLISH_INTERVAL, \
+    CONF_HEARTBEAT, MAX_REPLAY_RESPONSE_ROWS
+from .publisher import TrendPublisher
+from .replay import replay_database, write_csv
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_REPLAY = "replay"
+REPLAY_SCHEMA = vol.Schema(
+    {
+        vol.Required("entity_id"): cv.entity_ids,
+        vol.Required("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional(CONF_INTERVAL): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_STEPS): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_ALGORITHM): vol.In([ALGORITHM_MEAN_DELTA, *ALGORITHMS]),
+        vol.Optional(CONF_WINDOW_MODE): vol.In([WINDOW_MODE_TUMBLING, WINDOW_MODE_ROLLING]),
+        vol.Optional(CONF_TIME_WEIGHTED): cv.boolean,
+        vol.Optional("output"): cv.string,
+    }
+)
+
+
+def async_register_services(hass: HomeAssistant):
+    """Register the BetterTrends services, once for all config entries."""
+    if hass.services.has_service(DOMAIN, SERVICE_REPLAY):
+        return
+
+    async def async_replay(call: ServiceCall) -> ServiceResponse:
+        """Replay recorder history with the given settings and return or save the reported trends."""
+        if "recorder" not in hass.config.components:
+            raise HomeAssistantError("Replaying trends needs the recorder.")
+        db_url = get_instance(hass).db_url
+        if not db_url.startswith("sqlite:///"):
+            raise HomeAssistantError("Replaying trends reads the recorder's SQLite database, which is not in use.")
+        database = db_url.removeprefix("sqlite:///")
+
+        entity_ids = call.data["entity_id"]
+        end = dt_util.as_utc(call.data["end"]) if "end" in call.data else dt_util.utcnow()
+        start = dt_util.as_utc(call.data["start"])
+        if start >= end:
+            raise ServiceValidationError("The start of the replay must be before its end.")
+
+        # Entities on the same settings are replayed together, their rows merged in time order
+        rows = heapq.merge(
+            *(
+                replay_database(database, batch, start, end, **settings)
+                for batch, settings in _replay_batches(hass, call, entity_ids)
+            ),
+            key=lambda row: row[0],
+        )
+
+        if output := call.data.get("output"):
+            path = output if os.path.isabs(output) else hass.config.path(output)
+            if not hass.config.is_allowed_path(path):
+                raise ServiceValidationError(f"Writing to {path} is not allowed, add it to allowlist_external_dirs.")
+            count = await hass.async_add_executor_job(_write_rows, path, rows)
+            _LOGGER.info("Replayed %d trend values of %d entities into %s.", count, len(entity_ids), path)
+            return {"rows": count, "output": path}
+
+        if not call.return_response:
+            raise ServiceValidationError("Set an output file or call the service with a response.")
+        rows, truncated = await hass.async_add_executor_job(_collect_rows, rows)
+        return {
+            "rows": len(rows),
+            "truncated": truncated,
+            "series": [
+                {
+                    "timestamp": dt_util.utc_from_timestamp(timestamp).isoformat(),
+                    "entity_id": entity_id,
+                    "value": value,
+                    "trend": trend,
+                }
+                for timestamp, entity_id, value, trend in rows
+            ],
+        }
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REPLAY, async_replay, schema=REPLAY_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+
+
+def _replay_batches(hass: HomeAssistant, call: ServiceCall, entity_ids) -> list:
+    """Return (entity ids, TrendReplay settings) for every set of entities replayed with the same settings.
+
+    Settings not given in the call are those the trend sensor of each entity uses: the
+    interval and steps of its schedule, its algorithm and the options of its group.
+    Entities that are not tracked use the defaults.
+    """
+    coordinator = hass.data.get(DATA_COORDINATOR)
+    batches = {}  # (manager, interval, steps) -> entity ids
+    algorithms = {}
+    for entity_id in entity_ids:
+        manager = coordinator.manager_of(entity_id) if coordinator else None
+        if manager:
+            interval, steps, algorithm = manager.trend_settings(entity_id)
+        else:
+            interval, steps, algorithm = DEFAULT_INTERVAL, DEFAULT_TREND_VALUES, ALGORITHM_MEAN_DELTA
+        key = (manager, call.data.get(CONF_INTERVAL, interval), call.data.get(CONF_STEPS, steps))
+        batches.setdefault(key, []).append(entity_id)
+        algorithms[entity_id] = call.data.get(CONF_ALGORITHM, algorithm)
+
+    replays = []
+    for (manager, interval, steps), batch in batches.items():
+        options = manager.options if manager else {}
+        replays.append((batch, {
+            "interval": interval,
+            "steps": steps,
+            "rolling": call.data.get(CONF_WINDOW_MODE, options.get(CONF_WINDOW_MODE, DEFAULT_WINDOW_MODE))
+            == WINDOW_MODE_ROLLING,
+            "algorithms": {entity_id: algorithms[entity_id] for entity_id in batch},
+            "time_weighted": call.data.get(CONF_TIME_WEIGHTED, options.get(CONF_TIME_WEIGHTED, False)),
+            "publisher": TrendPublisher(
+                deadband_abs=float(options.get(CONF_DEADBAND_ABS, 0)),
+                deadband_rel=float(options.get(CONF_DEADBAND_REL, 0)) / 100,
+                min_interval=float(options.get(CONF_MIN_PUBLISH_INTERVAL, 0)),
+                heartbeat=float(options.get(CONF_HEARTBEAT, 0)),
+            ),
+        }))
+    return replays
+
+
+def _write_rows(path, rows) -> int:
+    """Write the rows to a CSV file and return how many there were. Runs in the executor."""
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        return write_csv(rows, file)
+
+
+def _collect_rows(rows, limit: int = MAX_REPLAY_RESPONSE_ROWS):
+    """Return the first ``limit`` rows and whether there were more. Runs in the executor."""
+    collected = []
+    for row in rows:
+        if len(collected) == limit:
+            rows.close()  # Stop reading the database
+            return collected, True
+        collected.append(row)
+    return collected, False
@@ -0,0 +1,72 @@
+"""Runtime statistics and profiling of the BetterTrends manager."""
+from collections import deque
+
+
+class TrendStats:
+    """Collect timings and counters of the trend engine for diagnostics."""
+
+    def __init__(self, samples: int = 100):
+        self._durations = deque(maxlen=samples)  # Processing time of the last ticks, in seconds
+        self._writes = deque()  # Monotonic times of the trend writes within the last minute
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.processed = 0  # Totals since startup
+        self.skipped = 0
+        self.tick_processed = 0  # Counts of the last tick
+        self.tick_skipped = 0
+        self._marks = (0, 0)
+
+    def record_tick(self, duration: float, lag: float):
+        """Remember how long a tick took, how late it started and what it processed."""
+        self._durations.append(duration)
+        self.last_lag = max(lag, 0.0)
+        self.max_lag = max(self.max_lag, self.last_lag)
+        self.tick_processed = self.processed - self._marks[0]
+        self.tick_skipped = self.skipped - self._marks[1]
+        self._marks = (self.processed, self.skipped)
+
+    def record_write(self, now: float):
+        """Remember a trend state write at monotonic time ``now``."""
+        self._writes.append(now)
+        self._expire_writes(now)
+
+    def writes_per_minute(self, now: float) -> int:
+        """Return the number of trend writes during the last 60 seconds."""
+        self._expire_writes(now)
+        return len(self._writes)
+
+    def _expire_writes(self, now: float):
+        while self._writes and self._writes[0] < now - 60:
+            self._writes.popleft()
+
+    def durations(self):
+        """Return (last, p50, p95) of the recorded tick durations, in seconds."""
+        if not self._durations:
+            return 0.0, 0.0, 0.0
+        ordered = sorted(self._durations)
+        return (
+            self._durations[-1],
+            ordered[len(ordered) // 2],
+            ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        )
+
+
+class TrendProfiler:
+    """Accumulate processing time per entity and per phase (read, buffer, publish)."""
+
+    def __init__(self):
+        self.phases = {}
+        self.entities = {}
+
+    def record(self, entity_id: str, phase: str, seconds: float):
+        """Add ``seconds`` to the totals of an entity and a phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        self.entities[entity_id] = self.entities.get(entity_id, 0.0) + seconds
+
+    def summary(self, top: int = 10) -> dict:
+        """Return the phase totals and the slowest entities, in milliseconds."""
+        slowest = sorted(self.entities.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "phases_ms": {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()},
+            "slowest_entities_ms": {entity_id: round(seconds * 1000, 3) for entity_id, seconds in slowest},
+        }
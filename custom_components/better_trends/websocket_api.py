@@ -0,0 +1,139 @@
+"""Websocket API streaming BetterTrends states and trend series to the Lovelace cards."""
+from datetime import timedelta
+import logging
+
+import voluptuous as vol
+
+from homeassistant.auth.permissions.const import POLICY_READ
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.exceptions import Unauthorized
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, DEFAULT_SERIES_POINTS, DEFAULT_SERIES_HOURS, MAX_SERIES_POINTS, DATA_COORDINATOR
+from .history import async_get_history_samples, downsample
+from .rollup import RESOLUTIONS
+
+_LOGGER = logging.getLogger(__name__)
+
+SERIES_SCHEMA = {
+    vol.Required("entity_ids"): cv.entity_ids,
+    vol.Optional("points", default=DEFAULT_SERIES_POINTS): vol.All(
+        vol.Coerce(int), vol.Range(min=0, max=MAX_SERIES_POINTS)
+    ),
+    vol.Optional("hours", default=DEFAULT_SERIES_HOURS): vol.All(vol.Coerce(float), vol.Range(min=0, max=24 * 7)),
+}
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant):
+    """Register the BetterTrends websocket commands."""
+    websocket_api.async_register_command(hass, websocket_series)
+    websocket_api.async_register_command(hass, websocket_subscribe)
+    websocket_api.async_register_command(hass, websocket_rollups)
+
+
+def _check_read(connection: websocket_api.ActiveConnection, entity_ids):
+    """Raise Unauthorized unless the user may read every entity, like the history API does."""
+    for entity_id in entity_ids:
+        if not connection.user.permissions.check_entity(entity_id, POLICY_READ):
+            raise Unauthorized(entity_id=entity_id, permission=POLICY_READ)
+
+
+def _state_payload(state: State):
+    """Return the part of a state the cards use, shaped like a state in ``hass.states``."""
+    if state is None:
+        return None
+    return {"state": state.state, "last_updated": state.last_updated.timestamp()}
+
+
+async def _async_series(hass: HomeAssistant, entity_ids, points: int, hours: float) -> dict:
+    """Return the recorded values of the entities over the last hours, downsampled to ``points`` each."""
+    if not points or not hours:
+        return {}
+    end_time = dt_util.utcnow()
+    start_time = end_time - timedelta(hours=hours)
+    try:
+        history = await async_get_history_samples(hass, entity_ids, start_time, end_time)
+    except Exception as e:
+        _LOGGER.warning("Could not read trend series from recorder history: %s", e)
+        return {}
+
+    start, end = start_time.timestamp(), end_time.timestamp()
+    return {entity_id: downsample(samples, start, end, points) for entity_id, samples in history.items()}
+
+
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/series", **SERIES_SCHEMA})
+@websocket_api.async_response
+async def websocket_series(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict):
+    """Return the downsampled recent series of the requested entities."""
+    _check_read(connection, msg["entity_ids"])
+    connection.send_result(msg["id"], await _async_series(hass, msg["entity_ids"], msg["points"], msg["hours"]))
+
+
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/subscribe", **SERIES_SCHEMA})
+@websocket_api.async_response
+async def websocket_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict):
+    """Stream the requested entities: current states and recent series first, then only their changes.
+
+    Changes made in the same event loop iteration, such as all trend writes of a tick,
+    are sent as one message.
+    """
+    msg_id = msg["id"]
+    entity_ids = msg["entity_ids"]
+    _check_read(connection, entity_ids)
+    pending = {}
+
+    @callback
+    def flush_updates():
+        if msg_id in connection.subscriptions and pending:
+            connection.send_message(websocket_api.event_message(msg_id, {"updates": dict(pending)}))
+        pending.clear()
+
+    @callback
+    def forward_change(event):
+        old_state = event.data["old_state"]
+        new_state = event.data["new_state"]
+        if old_state is not None and new_state is not None and old_state.state == new_state.state:
+            return  # Attribute updates and forced writes do not change what the cards show
+        if not pending:
+            hass.loop.call_soon(flush_updates)
+        pending[event.data["entity_id"]] = _state_payload(new_state)
+
+    connection.subscriptions[msg_id] = async_track_state_change_event(hass, entity_ids, forward_change)
+    connection.send_result(msg_id)
+    connection.send_message(
+        websocket_api.event_message(
+            msg_id, {"states": {entity_id: _state_payload(hass.states.get(entity_id)) for entity_id in entity_ids}}
+        )
+    )
+
+    # The series follow once the recorder answered, the cards render the current states meanwhile
+    series = await _async_series(hass, entity_ids, msg["points"], msg["hours"])
+    if series and msg_id in connection.subscriptions:
+        connection.send_message(websocket_api.event_message(msg_id, {"series": series}))
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/rollups",
+        vol.Required("entity_ids"): cv.entity_ids,
+        vol.Optional("resolution", default="hour"): vol.In(list(RESOLUTIONS)),
+    }
+)
+@callback
+def websocket_rollups(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict):
+    """Return the [start, min, mean, max] buckets of the requested trend sensors from memory."""
+    _check_read(connection, msg["entity_ids"])
+    coordinator = hass.data.get(DATA_COORDINATOR)
+    result = {}
+    for entity_id in msg["entity_ids"]:
+        rollups = coordinator.rollups(entity_id) if coordinator else None
+        if rollups is not None:
+            result[entity_id] = [
+                [start, minimum, round(mean, 3), maximum]
+                for start, minimum, mean, maximum in rollups.rings[msg["resolution"]].buckets()
+            ]
+    connection.send_result(msg["id"], result)